@@ -1,13 +1,25 @@
 import streamlit as st
 import os
-import pyodbc
+import math
+import threading
+import time
+import weakref
+import sqlite3
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from PIL import Image
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Callable
 from datetime import datetime
-
+from sla_core import (
+    ConnectionPool, Instrumentation, QueryBackend, create_backend, create_connection_pool,
+    QueryExecutor, DatabaseConnection, DETAIL_SCHEMA, build_detail_query, QUERY_DETAIL,
+    branch_filter, find_column, normalize_branch_selection, SLAAggregator, SLACountCube,
+    WatermarkStrategy, create_watermark, drop_unchanged_rows, merge_delta, SnapshotStore,
+    SharedResultCache, FigureCache, frame_fingerprint, SessionCache, SessionCacheRegistry,
+    format_bytes, DetailExporter, TrendStore, format_age, CacheWarmer,
+)
 
 # Set page config di bagian paling atas
 st.set_page_config(layout="wide", page_title="Dashboard SLA Maintenance HMS")
@@ -47,63 +59,167 @@ def login_page():
 if "logged_in" not in st.session_state or not st.session_state["logged_in"]:
     login_page()  # Tampilkan halaman login jika belum login
 else:
-    class DatabaseConnection:
-        def __init__(self, server: str, database: str, username: str, password: str, driver: str):
-            """
-            Inisialisasi parameter koneksi database
-            """
-            self.connection_string = (
-                f'DRIVER={{{driver}}};'
-                f'SERVER={server};'
-                f'DATABASE={database};'
-                f'UID={username};'
-                f'PWD={password};'
-                'TrustServerCertificate=yes'
-            )
-        
-        def fetch_data(self, query: str) -> Optional[pd.DataFrame]:
-            """
-            Ambil data dari database menggunakan query yang diberikan
-            """
-            try:
-                conn = pyodbc.connect(self.connection_string)
-                data = pd.read_sql_query(query, conn)
-                return data
-            except pyodbc.Error as e:
-                st.error(f"Error koneksi: {e}")
-                return None
-            finally:
-                if 'conn' in locals() and conn is not None:
-                    conn.close()
+    @st.cache_resource
+    def get_instrumentation(enabled: bool = True, jsonl_path: Optional[str] = None,
+                            prometheus_path: Optional[str] = None) -> Instrumentation:
+        """
+        Satu instrumentasi per proses server, dipakai bersama oleh semua sesi Streamlit
+        """
+        return Instrumentation(enabled, jsonl_path, prometheus_path)
+
+    @st.cache_resource
+    def get_connection_pool(backend_key: str, _backend: QueryBackend, max_size: int = 10,
+                            _instrumentation: Optional[Instrumentation] = None) -> ConnectionPool:
+        """
+        Satu pool koneksi per backend per proses server, dipakai bersama oleh semua sesi Streamlit
+        """
+        return create_connection_pool(_backend, max_size, _instrumentation)
+
+    @st.cache_resource
+    def get_query_executor(max_workers: int = 4) -> QueryExecutor:
+        """
+        Satu thread pool query per proses server
+        """
+        return QueryExecutor(max_workers=max_workers)
+
+    @st.cache_resource
+    def get_refresh_lock() -> threading.Lock:
+        """
+        Lock per proses agar refresh inkremental tidak berjalan bersamaan
+        """
+        return threading.Lock()
+
+    @st.cache_resource
+    def get_snapshot_store(directory: str, max_age: float = 600.0) -> SnapshotStore:
+        """
+        Satu SnapshotStore per direktori per proses server
+        """
+        return SnapshotStore(directory, max_age=max_age)
+
+    @st.cache_resource
+    def get_result_cache(ttl: float = 600.0, max_entries: int = 64, max_bytes: int = 1024 ** 3) -> SharedResultCache:
+        """
+        Satu cache hasil per proses server, dipakai bersama oleh semua sesi Streamlit.
+        Data detail dan cube semua cabang tidak pernah dibuang oleh batas LRU
+        """
+        return SharedResultCache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes,
+                                 pinned=[('detail', ()), ('cube', ())])
+
+    @st.cache_resource
+    def get_figure_cache(max_entries: int = 256) -> FigureCache:
+        """
+        Satu cache figure per proses server, dipakai bersama oleh semua sesi Streamlit
+        """
+        return FigureCache(max_entries)
+
+    @st.cache_resource
+    def load_logo(path: str) -> Optional[Image.Image]:
+        """
+        Logo dibaca sekali per proses, bukan di setiap rerun
+        """
+        try:
+            image = Image.open(path)
+            image.load()
+            return image
+        except FileNotFoundError:
+            return None
+
+    @st.cache_resource
+    def get_session_cache_registry() -> SessionCacheRegistry:
+        """
+        Registry cache sesi bersama untuk seluruh proses server
+        """
+        return SessionCacheRegistry()
+
+    @st.cache_resource
+    def get_detail_exporter(directory: str, static_dir: Optional[str] = None) -> DetailExporter:
+        """
+        Satu eksportir per direktori per proses server
+        """
+        return DetailExporter(directory, static_dir=static_dir)
+
+    @st.cache_resource
+    def get_trend_store(path: str) -> TrendStore:
+        """
+        Satu trend store per file per proses server
+        """
+        return TrendStore(path)
+
+    @st.cache_resource
+    def get_cache_warmer(interval: float, _warm: Callable[[bool, bool], str]) -> CacheWarmer:
+        """
+        Satu warmer per proses server; fungsi warm berasal dari dashboard pertama yang membuatnya
+        """
+        return CacheWarmer(_warm, interval).start()
 
     class SLADashboard:
-        def __init__(self, db_connection: DatabaseConnection):
+        # Gauge (judul, komponen) dan grafik batang (komponen, judul); dipakai region dan warmer
+        GAUGE_CHARTS = [('ACCU', 'accu'), ('Kopling', 'kopling'), ('PB', 'pb'), ('Ban', 'ban')]
+        BAR_CHARTS = [
+            ('accu', 'Persentase Capaian SLA ACCU by Cabang'),
+            ('ban', 'Persentase Capaian SLA Ban by Cabang'),
+            ('kopling', 'Persentase Capaian SLA Kopling by Cabang'),
+            ('pb', 'Persentase Capaian SLA PB by Cabang')
+        ]
+
+        def __init__(self, db_connection: DatabaseConnection, cache_ttl: float = 600.0,
+                     session_cache_entries: int = 8, session_cache_bytes: int = 256 * 1024 ** 2,
+                     shared_cache_entries: int = 64, shared_cache_bytes: int = 1024 ** 3,
+                     watermark: Optional[WatermarkStrategy] = None,
+                     query_timeout: Optional[float] = 120.0, query_workers: int = 4,
+                     snapshot_store: Optional[SnapshotStore] = None,
+                     instrumentation: Optional[Instrumentation] = None,
+                     warm_interval: Optional[float] = None,
+                     exporter: Optional[DetailExporter] = None,
+                     trend_store: Optional[TrendStore] = None):
             """
             Inisialisasi Dashboard SLA
             """
             self.db_connection = db_connection
+            # Pengukuran per tahap untuk panel diagnostik admin (nonaktif = tanpa overhead berarti)
+            self.instrumentation = instrumentation or Instrumentation(enabled=False)
+            # Query independen dijalankan bersamaan dengan batas waktu per query
+            self.query_executor = get_query_executor(query_workers)
+            self.query_timeout = query_timeout
+            self.aggregator = SLAAggregator()
+            self.result_cache = get_result_cache(cache_ttl, shared_cache_entries, shared_cache_bytes)
+            self.figure_cache = get_figure_cache()
+            # Strategi watermark untuk refresh inkremental (None = selalu muat ulang penuh)
+            self.watermark = watermark
+            self.detail_query = build_detail_query(watermark.extra_columns) if watermark else QUERY_DETAIL
+            # Snapshot lokal SLA_HMS (None = selalu ambil langsung dari database)
+            self.snapshot_store = snapshot_store
+            # Ekspor data detail ke file (None = tanpa tombol unduh)
+            self.exporter = exporter
+            # Rollup harian untuk grafik tren SLA (None = tanpa region tren)
+            self.trend_store = trend_store
+            # Warmer latar belakang per proses (None = data dimuat saat diminta sesi)
+            self.warmer = get_cache_warmer(warm_interval, self.warm_data) if warm_interval else None
             self.setup_page()
             # Inisialisasi state untuk cache data
             if 'last_refresh_time' not in st.session_state:
                 st.session_state.last_refresh_time = datetime.now()
             
-            # Inisialisasi cache untuk data
+            # Inisialisasi cache untuk data (dibatasi jumlah entri dan ukuran memorinya)
             if 'sla_data' not in st.session_state:
-                st.session_state.sla_data = {
-                    'results': {},
-                    'branch_results': {},
-                    'data_detail': None
-                }
+                st.session_state.sla_data = SessionCache(session_cache_entries, session_cache_bytes,
+                                                         shared=self.result_cache.holds)
+                get_session_cache_registry().register(st.session_state.sla_data)
+            
+            # Data bersama sudah diganti (refresh sesi lain atau warmer): buang turunan lama di cache sesi
+            generation = self.result_cache.generation()
+            if st.session_state.get('data_generation') != generation:
+                st.session_state.sla_data.clear()
+                st.session_state.data_generation = generation
         
+        @st.fragment
         def setup_page(self):
             """Konfigurasi tata letak dan judul halaman Streamlit"""
             
-            # Muat logo
-            try:
-                image = Image.open('logo-assa.png')
-            except FileNotFoundError:
+            # Muat logo (di-cache per proses)
+            image = load_logo('logo-assa.png')
+            if image is None:
                 st.warning("File logo tidak ditemukan")
-                image = None
             
             # Header halaman
             col1, col2, col3 = st.columns([0.1, 0.8, 0.1])
@@ -125,17 +241,36 @@ else:
 
             with col3:
                 if st.button("🔄 Refresh Data", key="unique_refresh_button"):
-                    self.refresh_data()    
-        def refresh_data(self):
+                    self.refresh_data()
+                if self.watermark is not None and st.button("Muat Ulang Penuh", key="full_reload_button"):
+                    self.refresh_data(full=True)
+        def refresh_data(self, full: bool = False):
             """
-            Refresh semua data pada dashboard
+            Refresh semua data pada dashboard. Jika strategi watermark tersedia, hanya baris
+            yang berubah yang diambil; muat ulang penuh dipakai sebagai cadangan
             """
+            if self.warmer is not None:
+                # Pembaruan berjalan di thread warmer; halaman tetap memakai data terakhir
+                # dan dimuat ulang otomatis setelah data baru siap (lihat watch_data_version)
+                self.warmer.trigger(full=full)
+                st.session_state.last_refresh_info = "pembaruan latar belakang" + (" (penuh)" if full else "")
+                st.toast("Pembaruan data berjalan di latar belakang")
+                return
+            
+            refresh_info = None
+            if not full and self.watermark is not None:
+                refresh_info = self.apply_incremental_refresh()
+            
+            if refresh_info is None:
+                # Invalidasi cache bersama (dan snapshot) agar semua sesi mengambil data terbaru
+                if self.snapshot_store is not None:
+                    self.snapshot_store.expire()
+                self.result_cache.invalidate()
+                refresh_info = "muat ulang penuh"
+            st.session_state.last_refresh_info = refresh_info
+            
             # Reset cache data
-            st.session_state.sla_data = {
-                'results': {},
-                'branch_results': {},
-                'data_detail': None
-            }
+            st.session_state.sla_data.clear()
             
             # Update waktu refresh terakhir
             st.session_state.last_refresh_time = datetime.now()
@@ -146,6 +281,44 @@ else:
             # Gunakan st.rerun() sebagai pengganti experimental_rerun()
             st.rerun()
 
+        def apply_incremental_refresh(self) -> Optional[str]:
+            """
+            Ambil baris yang berubah sejak watermark dan gabungkan ke data detail dan cube
+            di cache bersama. Mengembalikan ringkasan, atau None jika perlu muat ulang penuh
+            """
+            with get_refresh_lock():
+                data_all = self.result_cache.peek(('detail', ()))
+                cube = self.result_cache.peek(('cube', ()))
+                if data_all is None or data_all.empty or cube is None:
+                    return None
+                key_column = find_column(data_all, self.watermark.key_column)
+                if key_column is None:
+                    return None
+                
+                delta = self.watermark.fetch_delta(self.db_connection, self.watermark.watermark(data_all))
+                if delta is None:
+                    return None
+                rows, deleted_keys = delta
+                # Tanpa perubahan nyata, data bersama dan snapshot tidak disentuh (generasi tetap)
+                rows = drop_unchanged_rows(data_all, rows, key_column)
+                if deleted_keys:
+                    deleted_keys = pd.Index(deleted_keys).intersection(data_all[key_column]).tolist()
+                if rows.empty and not deleted_keys:
+                    return "inkremental: tidak ada perubahan"
+                merged, removed, added = merge_delta(data_all, rows, deleted_keys, key_column)
+                
+                # Perbarui cube dengan mengurangi baris lama dan menambahkan baris baru
+                cube = cube.merge(SLACountCube.from_frame(removed, self.aggregator), sign=-1)
+                cube = cube.merge(SLACountCube.from_frame(added, self.aggregator), sign=1)
+                
+                # Snapshot lokal ikut diperbarui agar proses lain juga melihat data terbaru
+                if self.snapshot_store is not None:
+                    merged = self.snapshot_store.read(self.snapshot_store.write(merged))
+                
+                # Subset cabang lain akan dihitung ulang dari data gabungan
+                self.result_cache.replace({('detail', ()): merged, ('cube', ()): cube})
+                return f"inkremental: {len(added)} baris berubah, {len(deleted_keys)} dihapus"
+
             # Menampilkan tombol logout
         if st.button("Logout", key="unique_logout_button"):
             st.session_state.logged_in = False
@@ -154,53 +327,271 @@ else:
             st.rerun()  # Refresh halaman untuk kembali ke login page
 
 
-        def fetch_or_get_cached_data(self, queries: Dict[str, str], is_branch_query: bool = False, branch_filter: str = "") -> Dict[str, pd.DataFrame]:
+        def fetch_or_get_cached_data(self, queries: Dict[str, str], branches: Tuple[str, ...] = (),
+                                     schema: Optional[Dict[str, str]] = None) -> Dict[str, pd.DataFrame]:
+            with self.instrumentation.span('fetch_or_get_cached_data', queries=len(queries)) as span:
+                return self._fetch_or_get_cached_data(queries, branches, schema, span)
+
+        def _fetch_or_get_cached_data(self, queries: Dict[str, str], branches: Tuple[str, ...],
+                                      schema: Optional[Dict[str, str]], span: Any) -> Dict[str, pd.DataFrame]:
             try:
-                # Tambahkan branch_filter sebagai parameter untuk membedakan cache
-                cache_key = f'branch_results_{branch_filter}' if is_branch_query else f'results_{branch_filter}'
+                # Cache dibedakan berdasarkan himpunan cabang yang sudah dinormalisasi
+                cache_key = f'results_{branches}'
                 
-                # Jika data sudah ada di cache, kembalikan
+                # Jika data sudah ada di cache sesi, kembalikan
                 if cache_key in st.session_state.sla_data and st.session_state.sla_data[cache_key]:
+                    self.instrumentation.cache_lookup('session', hit=True)
+                    span.record(cache='session')
                     return st.session_state.sla_data[cache_key]
+                self.instrumentation.cache_lookup('session', hit=False)
                 
-                # Jika belum, ambil data dari database
-                fetched_data = {}
+                # Jika belum, ambil dari cache bersama atau dari database; semua query jalan bersamaan
+                filter_sql, params = self.generate_branch_filter_sql(list(branches))
+                tasks = {}
                 for key, query in queries.items():
-                    # Tambahkan branch_filter ke dalam query
-                    modified_query = query.replace('{branch_filter}', branch_filter)
-                    data = self.db_connection.fetch_data(modified_query)
-                    
+                    # Cabang diikat sebagai parameter, bukan disisipkan ke teks query
+                    statement = query.replace('{branch_filter}', filter_sql)
+                    tasks[key] = lambda key=key, q=statement: self.cached_result(
+                        (key, branches),
+                        lambda: self.db_connection.query_data(q, timeout=self.query_timeout, schema=schema,
+                                                              params=params)
+                    )
+                results, errors = self.query_executor.run_all(
+                    tasks, timeout=self.query_timeout + 5 if self.query_timeout else None
+                )
+                
+                fetched_data = {}
+                empty_keys = []
+                for key in queries:
+                    data = results.get(key)
+                    span.record_frame(data)
                     if data is not None and not data.empty:
                         fetched_data[key] = data
                     else:
-                        st.warning(f"Tidak ada data untuk query {key}")
+                        if key not in errors:
+                            empty_keys.append(key)
                         fetched_data[key] = pd.DataFrame()
                 
-                # Simpan ke cache dengan key baru
-                st.session_state.sla_data[cache_key] = fetched_data
+                # Error dan hasil kosong dilaporkan sekali setelah semua query selesai
+                if errors:
+                    st.error("Gagal mengambil data: " + "; ".join(f"{key}: {error}" for key, error in errors.items()))
+                if empty_keys:
+                    st.warning(f"Tidak ada data untuk query {', '.join(empty_keys)}")
+                
+                # Simpan ke cache sesi (hanya jika tidak ada query yang gagal)
+                if not errors:
+                    st.session_state.sla_data[cache_key] = fetched_data
                 
                 return fetched_data
             except Exception as e:
                 st.error(f"Terjadi kesalahan saat mengambil data: {e}")
                 return {}
-        @st.cache_data
-        def fetch_data_cached(self, query: str):
-            return self.db_connection.fetch_data(query)
 
-        def create_sidebar_filters(self) -> Dict[str, Any]:
+        def cached_result(self, key: Any, compute: Callable[[], Any], stage: Optional[str] = None) -> Any:
+            """
+            Ambil dari cache bersama; hit/miss dicatat, dan durasi `compute` dicatat sebagai `stage`
+            """
+            if not self.instrumentation.enabled:
+                return self.result_cache.get_or_compute(key, compute)
+            computed = []
+
+            def measured() -> Any:
+                computed.append(True)
+                if stage is None:
+                    return compute()
+                with self.instrumentation.span(stage):
+                    return compute()
+            value = self.result_cache.get_or_compute(key, measured)
+            self.instrumentation.cache_lookup('shared', hit=not computed)
+            return value
+
+        def get_count_cube(self, data_all: Optional[pd.DataFrame]) -> SLACountCube:
+            """
+            Cube jumlah unit untuk semua cabang; dibangun sekali per refresh dan dipakai bersama
+            """
+            if 'cube' not in st.session_state.sla_data:
+                stale_cube = self.result_cache.peek(('cube', ())) if self.warmer is not None else None
+                if stale_cube is not None:
+                    # Stale-while-revalidate, seperti data detail di load_all_detail
+                    st.session_state.sla_data['cube'] = stale_cube
+                elif data_all is None or data_all.empty:
+                    st.session_state.sla_data['cube'] = SLACountCube.from_frame(data_all, self.aggregator)
+                else:
+                    st.session_state.sla_data['cube'] = self.cached_result(
+                        ('cube', ()),
+                        lambda: SLACountCube.from_frame(data_all, self.aggregator),
+                        stage='cube.build'
+                    )
+            return st.session_state.sla_data['cube']
+        
+        def get_branch_detail(self, data_all: Optional[pd.DataFrame], branches: Tuple[str, ...]) -> Optional[pd.DataFrame]:
+            """
+            Baris detail untuk subset cabang, difilter dari data semua cabang di memori
+            """
+            if not branches or data_all is None or data_all.empty:
+                return data_all
+            cache_key = f'data_detail_{branches}'
+            if cache_key not in st.session_state.sla_data:
+                snapshot = data_all.attrs.get('snapshot')
+                if snapshot is not None:
+                    # Predicate pushdown: hanya record batch cabang terpilih yang dibaca dari snapshot
+                    compute = lambda: self.snapshot_store.read(snapshot, branches)
+                else:
+                    branch_column = find_column(data_all, 'Nama_Cabang')
+                    compute = lambda: data_all[data_all[branch_column].isin(branches)].reset_index(drop=True)
+                st.session_state.sla_data[cache_key] = self.cached_result(('detail', branches), compute, stage='detail.filter')
+            return st.session_state.sla_data[cache_key]
+        
+        def load_all_detail(self) -> Optional[pd.DataFrame]:
+            """
+            Data detail semua cabang: dari snapshot lokal jika dikonfigurasi, jika tidak dari database
+            """
+            if self.snapshot_store is not None and self.snapshot_superseded():
+                # Snapshot sementara sudah digantikan file baru: lepaskan dari cache bersama dan sesi
+                self.result_cache.invalidate()
+                st.session_state.sla_data.clear()
+                st.session_state.data_generation = self.result_cache.generation()
+            
+            if self.warmer is not None:
+                # Stale-while-revalidate: hasil terakhir tetap dipakai walau melewati TTL cache,
+                # warmer yang memperbaruinya di latar belakang
+                data = self.result_cache.peek(('detail', ()))
+                if data is not None:
+                    return data
+            
+            if self.snapshot_store is None:
+                return self.fetch_or_get_cached_data({'detail': self.detail_query}, schema=DETAIL_SCHEMA).get('detail')
+            
+            if 'snapshot' not in st.session_state.sla_data:
+                def load() -> Optional[pd.DataFrame]:
+                    previous = self.snapshot_store.current()
+                    progress, placeholder = self.fetch_progress(previous['rows'] if previous else None)
+                    try:
+                        return self.extract_all_detail(progress=progress)
+                    except Exception as e:
+                        st.error(f"Gagal memuat snapshot data: {e}")
+                        return None
+                    finally:
+                        placeholder.empty()
+                
+                data = self.cached_result(('detail', ()), load, stage='snapshot.load')
+                if data is None:
+                    return None
+                st.session_state.sla_data['snapshot'] = data
+            return st.session_state.sla_data['snapshot']
+        
+        def snapshot_superseded(self) -> bool:
+            """
+            True jika data yang sedang dipakai adalah snapshot sementara (proses lain sedang
+            mengekstrak, atau ekstraksi gagal) dan snapshot yang lebih baru sudah tersedia
+            """
+            candidates = [self.result_cache.peek(('detail', ()))]
+            if 'snapshot' in st.session_state.sla_data:
+                candidates.append(st.session_state.sla_data['snapshot'])
+            provisional = [
+                data.attrs['snapshot'] for data in candidates
+                if data is not None and 'snapshot' in data.attrs
+                and (data.attrs['snapshot'].get('extracting') or data.attrs['snapshot'].get('stale'))
+            ]
+            if not provisional:
+                return False
+            current = self.snapshot_store.current()
+            return current is not None and any(current['file'] != info['file'] for info in provisional)
+        
+        def extract_all_detail(self, force: bool = False,
+                               progress: Optional[Callable[[int], None]] = None) -> pd.DataFrame:
+            """
+            Ambil data detail semua cabang dari database (lewat snapshot jika dikonfigurasi).
+            `force` mengabaikan snapshot yang masih segar
+            """
+            query = self.detail_query.replace('{branch_filter}', '')
+            extract = lambda: self.db_connection.query_data(
+                query, timeout=self.query_timeout, schema=DETAIL_SCHEMA, progress=progress
+            )
+            if self.snapshot_store is None:
+                return extract()
+            if force:
+                self.snapshot_store.expire()
+            return self.snapshot_store.load(extract)
+        
+        def warm_data(self, full: bool = False, scheduled: bool = False) -> str:
+            """
+            Dijalankan thread warmer: perbarui data detail semua cabang, cube (daftar cabang dan
+            agregat 'All') dan figure 'All' di cache bersama. Hasil lama tetap dilayani sampai
+            hasil baru menggantikannya secara atomik. Putaran terjadwal memakai snapshot yang
+            masih segar dan hanya mengganti cache bersama jika data berubah; tombol Refresh
+            selalu mengekstrak ulang
+            """
+            if self.result_cache.peek(('detail', ())) is None:
+                # Muat awal: digabung (single-flight) dengan sesi yang meminta data yang sama
+                data = self.result_cache.get_or_compute(('detail', ()), self.extract_all_detail)
+                info = "muat awal"
+            else:
+                info = self.apply_incremental_refresh() if not full and self.watermark is not None else None
+                if info is None and scheduled:
+                    info = self.reload_if_changed()
+                if info is None:
+                    with get_refresh_lock():
+                        data = self.extract_all_detail(force=True)
+                        cube = SLACountCube.from_frame(data, self.aggregator)
+                        self.result_cache.replace({('detail', ()): data, ('cube', ()): cube})
+                    info = "muat ulang penuh"
+                data = self.result_cache.peek(('detail', ()))
+            if data is None:
+                raise RuntimeError("Data detail tidak tersedia")
+            cube = self.result_cache.get_or_compute(('cube', ()), lambda: SLACountCube.from_frame(data, self.aggregator))
+            self.record_trend(cube)
+            
+            # Figure untuk pilihan 'All' disiapkan agar sesi baru langsung mendapat cache hit
+            sla_percentages, branch_results = cube.query(())
+            for title, key in self.GAUGE_CHARTS:
+                self.gauge_figure(title, sla_percentages[key])
+            for key, title in self.BAR_CHARTS:
+                self.branch_figure(key, title, branch_results[key])
+            return info
+        
+        def reload_if_changed(self) -> str:
+            """
+            Muat data detail tanpa memaksa ekstraksi (snapshot yang masih segar dipakai ulang)
+            dan ganti cache bersama hanya jika file snapshot atau datanya berubah
+            """
+            with get_refresh_lock():
+                current = self.result_cache.peek(('detail', ()))
+                data = self.extract_all_detail()
+                if current is not None:
+                    if self.snapshot_store is not None:
+                        unchanged = data.attrs.get('snapshot', {}).get('file') == current.attrs.get('snapshot', {}).get('file')
+                    else:
+                        unchanged = data.equals(current)
+                    if unchanged:
+                        return "terjadwal: tidak ada perubahan"
+                cube = SLACountCube.from_frame(data, self.aggregator)
+                self.result_cache.replace({('detail', ()): data, ('cube', ()): cube})
+            return "terjadwal: data diperbarui"
+        
+        def fetch_progress(self, expected_rows: Optional[int]) -> Tuple[Callable[[int], None], Any]:
+            """
+            Indikator progres pembacaan data detail per batch; perkiraan total diambil
+            dari jumlah baris snapshot sebelumnya jika ada
+            """
+            placeholder = st.empty()
+            
+            def update(rows: int):
+                text = f"Memuat data detail: {rows:,} baris"
+                if expected_rows:
+                    placeholder.progress(min(rows / expected_rows, 1.0), text=text)
+                else:
+                    placeholder.caption(text)
+            return update, placeholder
+        
+        def create_sidebar_filters(self, branch_names: List[str]) -> Dict[str, Any]:
             """
             Buat filter sidebar untuk pemilihan cabang
             """
             st.sidebar.title("Filter Data")
             
-            # Ambil daftar cabang
-            query_cabang = "SELECT DISTINCT Nama_Cabang FROM SLA_HMS"
-            data_cabang = self.db_connection.fetch_data(query_cabang)
-            
-            cabang_list = ['All']
-            if data_cabang is not None:
-                sorted_cabang = sorted(data_cabang['Nama_Cabang'].tolist())
-                cabang_list += sorted_cabang
+            # Daftar cabang diambil dari cube, bukan SELECT DISTINCT ke database
+            cabang_list = ['All'] + branch_names
             
             selected_cabang = st.sidebar.multiselect(
                 "Pilih Cabang", 
@@ -212,22 +603,21 @@ else:
                 'selected_cabang': selected_cabang
             }
         
-        def generate_branch_filter_sql(self, selected_cabang: List[str]) -> str:
+        def generate_branch_filter_sql(self, selected_cabang: List[str]) -> Tuple[str, Tuple[str, ...]]:
             """
-            Hasilkan filter SQL untuk cabang
+            Hasilkan filter SQL berparameter untuk cabang: (klausa dengan placeholder ?, nilai parameter)
             """
-            # Jika "All" dipilih atau tidak ada pilihan, kembalikan string kosong
-            if not selected_cabang or "All" in selected_cabang:
-                return ""
-            
-            # Buat filter untuk cabang yang dipilih
-            branch_filter = f"AND Nama_Cabang IN ({', '.join(f"'{cabang}'" for cabang in selected_cabang)})"
-            return branch_filter
+            # Jika "All" dipilih atau tidak ada pilihan, klausa kosong tanpa parameter
+            return branch_filter(normalize_branch_selection(selected_cabang))
         
         def create_gauge_chart(self, title: str, value: float) -> go.Figure:
             """
             Buat gauge chart untuk persentase SLA
             """
+            with self.instrumentation.span('chart.gauge'):
+                return self._create_gauge_chart(title, value)
+
+        def _create_gauge_chart(self, title: str, value: float) -> go.Figure:
             fig = go.Figure(go.Indicator(
                 mode="gauge+number",
                 value=value,
@@ -251,31 +641,27 @@ else:
             Siapkan data kategorik untuk grafik batang
             """
             # Temukan nama kolom yang sesuai tanpa memperhatikan kapitalisasi
-            matching_column = None
-            for col in data.columns:
-                if col.lower() == category_column.lower():
-                    matching_column = col
-                    break
-            
+            matching_column = find_column(data, category_column)
             if matching_column is None:
                 st.warning(f"Kolom {category_column} tidak ditemukan dalam data")
                 return data
             
-            # Gunakan nama kolom yang cocok
-            data[matching_column] = data[matching_column].apply(lambda x: 'OK' if str(x).upper() == 'OK' else 'NOT OK')
-            return data
+            # Gunakan nama kolom yang cocok (vektorisasi; NULL menjadi NOT OK)
+            # Hasil dari cache bersama tidak boleh diubah langsung, jadi buat salinan
+            is_ok = (data[matching_column].astype('string').str.upper() == 'OK').fillna(False).to_numpy(dtype=bool)
+            return data.assign(**{matching_column: np.where(is_ok, 'OK', 'NOT OK')})
         
         def create_bar_chart(self, data: pd.DataFrame, title: str, category_column: str) -> go.Figure:
             """
             Buat grafik batang tumpuk untuk kinerja SLA per cabang
             """
+            with self.instrumentation.span('chart.bar') as span:
+                span.record_frame(data)
+                return self._create_bar_chart(data, title, category_column)
+
+        def _create_bar_chart(self, data: pd.DataFrame, title: str, category_column: str) -> go.Figure:
             # Temukan nama kolom yang sesuai tanpa memperhatikan kapitalisasi
-            matching_column = None
-            for col in data.columns:
-                if col.lower() == category_column.lower():
-                    matching_column = col
-                    break
-            
+            matching_column = find_column(data, category_column)
             if matching_column is None:
                 st.warning(f"Kolom {category_column} tidak ditemukan dalam data")
                 return go.Figure()
@@ -295,227 +681,450 @@ else:
             )
             return fig
         
-        def run_dashboard(self):
+        def cached_figure(self, key: Any, build: Callable[[], go.Figure]) -> go.Figure:
             """
-            Metode utama untuk menjalankan Dashboard SLA
+            Figure dari cache figure bersama; hanya dibangun ulang jika data masukannya berubah
+            """
+            fig, hit = self.figure_cache.get_or_create(key, build)
+            self.instrumentation.cache_lookup('figure', hit)
+            return fig
+        
+        def gauge_figure(self, title: str, value: float) -> go.Figure:
+            chart_title = f"Persentase SLA {title}"
+            return self.cached_figure(
+                ('gauge', chart_title, float(value)),
+                lambda: self.create_gauge_chart(chart_title, value)
+            )
+        
+        def branch_figure(self, key: str, title: str, data: pd.DataFrame) -> go.Figure:
+            return self.cached_figure(
+                ('bar', title, frame_fingerprint(data)),
+                lambda: self.build_branch_chart(data, title, key)
+            )
+        
+        @st.fragment
+        def show_gauges(self, sla_percentages: Dict[str, float]):
+            """
+            Region gauge SLA keseluruhan
             """
-            # Tampilkan waktu refresh terakhir
-            st.sidebar.info(f"Terakhir diperbarui: {st.session_state.last_refresh_time.strftime('%d-%m-%Y %H:%M:%S')}")
-            
-            # Dapatkan filter
-            filters = self.create_sidebar_filters()
-            branch_filter = self.generate_branch_filter_sql(filters['selected_cabang'])
-        
-            
-            # Query untuk data SLA
-            queries = {
-                'accu': f"""
-                    SELECT 
-                        ROUND((SUM(CASE WHEN Status_ACCU = 'OK' THEN 1 END) * 1.0 / COUNT(*)), 3) AS persentase
-                    FROM SLA_HMS
-                    WHERE 1=1 {branch_filter}
-                """,
-                'kopling': f"""
-                    SELECT 
-                        ROUND((SUM(CASE WHEN Status_Kopling = 'OK' THEN 1 END) * 1.0 / COUNT(*)), 3) AS persentase
-                    FROM SLA_HMS
-                    WHERE tipe_transmisi <> 'A/T' {branch_filter}
-                """,
-                'pb': f"""
-                    SELECT 
-                        ROUND((SUM(CASE WHEN Status_PB = 'OK' THEN 1 END) * 1.0 / COUNT(*)), 3) AS persentase
-                    FROM SLA_HMS
-                    WHERE 1=1 {branch_filter}
-                """,
-                'ban': f"""
-                    SELECT 
-                        ROUND((SUM(CASE WHEN Status_Ban = 'OK' THEN 1 END) * 1.0 / COUNT(*)), 3) AS persentase
-                    FROM SLA_HMS
-                    WHERE 1=1 {branch_filter}
-                """
-            }
-            
-            # Query untuk data per cabang
-            branch_queries = {
-                'accu': f"""
-                    SELECT 
-                        Nama_Cabang,
-                        Status_ACCU,
-                        ROUND(
-                            (COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY Nama_Cabang)) * 100, 
-                        2) AS persentase
-                    FROM SLA_HMS
-                    WHERE 1=1 {branch_filter}
-                    GROUP BY Nama_Cabang, Status_ACCU
-                """,
-                'ban': f"""
-                    SELECT 
-                        Nama_Cabang,
-                        Status_Ban,
-                        ROUND(
-                            (COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY Nama_Cabang)) * 100, 
-                        2) AS persentase
-                    FROM SLA_HMS
-                    WHERE 1=1 {branch_filter}
-                    GROUP BY Nama_Cabang, Status_Ban
-                """,
-                'kopling': f"""
-                    SELECT 
-                        Nama_Cabang,
-                        Status_Kopling,
-                        ROUND(
-                            (COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY Nama_Cabang)) * 100, 
-                        2) AS persentase
-                    FROM SLA_HMS
-                    WHERE tipe_transmisi <> 'A/T' {branch_filter}
-                    GROUP BY Nama_Cabang, Status_Kopling
-                """,
-                'pb': f"""
-                    SELECT 
-                        Nama_Cabang,
-                        Status_PB,
-                        ROUND(
-                            (COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY Nama_Cabang)) * 100, 
-                        2) AS persentase
-                    FROM SLA_HMS
-                    WHERE 1=1 {branch_filter}
-                    GROUP BY Nama_Cabang, Status_PB
-                """
-            }
-            
-            # Query detail
-            query_detail = f"""
-                SELECT
-                Nomor_Customer,
-                Nama_Customer,
-                Nama_Cabang,
-                Nomor_Equipment,
-                Nomor_Polisi,
-                Kelompok_Model,
-                kategori_unit,
-                Tipe_Transmisi,
-                km_harian,
-                Last_KM_Update,
-                Last_KM_ACCU,
-                Last_Tgl_Release_ACCU_SPK,
-                Konsumsi_ACCU,
-                Indikator_ACCU,
-                Status_ACCU,
-                Tgl_Plan_Pergantian_ACCU,
-                Last_KM_Kopling,
-                Last_Tgl_Release_Kopling_SPK,
-                Konsumsi_Kopling,
-                Indikator_Kopling,
-                Status_Kopling,
-                Tgl_Plan_Pergantian_Kopling,
-                Last_KM_Ban,
-                Last_Tgl_Release_Ban_SPK,
-                Konsumsi_Ban,
-                Indikator_Ban,
-                Status_Ban,
-                Last_KM_PB,
-                Tgl_Last_Service_PB,
-                Selisih_KM_Service,
-                Status_PB,
-                Next_Plan_KM_Service,
-                Tanggal_Plan_Service
-                FROM SLA_HMS
-                WHERE 1=1 {branch_filter}
-            """
-            
-            # Ambil data menggunakan cache
-            results = self.fetch_or_get_cached_data(queries, branch_filter=branch_filter)
-            branch_results = self.fetch_or_get_cached_data(branch_queries, is_branch_query=True, branch_filter=branch_filter)
-            
-            # Ambil data detail jika belum di-cache
-            if f'data_detail_{branch_filter}' not in st.session_state.sla_data:
-                st.session_state.sla_data[f'data_detail_{branch_filter}'] = self.db_connection.fetch_data(query_detail)
-            data_detail = st.session_state.sla_data[f'data_detail_{branch_filter}']
-                
-            # Hitung persentase
-            sla_percentages = {
-                key: results[key]['persentase'].iloc[0] * 100 
-                if results[key] is not None and not results[key].empty 
-                else 0 
-                for key in results
-            }
-            
-            # Siapkan data cabang untuk grafik
-            processed_branch_data = {}
-            for key in branch_results:
-                try:
-                    processed_branch_data[key] = self.prepare_categorical_data(
-                        branch_results[key], 
-                        f'Status_{key.capitalize()}'
-                    )
-                except Exception as e:
-                    st.error(f"Gagal memproses data untuk {key}: {e}")
-                    processed_branch_data[key] = branch_results[key]
-            
-            # Buat gauge chart untuk SLA keseluruhan
             col3, col4, col5, col6 = st.columns(4)
-            charts = [
-                ('ACCU', sla_percentages['accu']),
-                ('Kopling', sla_percentages['kopling']),
-                ('PB', sla_percentages['pb']),
-                ('Ban', sla_percentages['ban'])
-            ]
-            
             columns = [col3, col4, col5, col6]
-            for (title, value), column in zip(charts, columns):
+            for (title, key), column in zip(self.GAUGE_CHARTS, columns):
                 with column:
-                    st.plotly_chart(
-                        self.create_gauge_chart(f"Persentase SLA {title}", value), 
-                        use_container_width=True
-                    )
-            
-            # Konfigurasi grafik batang
-            bar_chart_configs = [
-                ('accu', 'Persentase Capaian SLA ACCU by Cabang'),
-                ('ban', 'Persentase Capaian SLA Ban by Cabang'),
-                ('kopling', 'Persentase Capaian SLA Kopling by Cabang'),
-                ('pb', 'Persentase Capaian SLA PB by Cabang')
-            ]
-            
+                    fig = self.gauge_figure(title, sla_percentages[key])
+                    with self.instrumentation.span('render.plotly_chart', chart='gauge'):
+                        st.plotly_chart(fig, use_container_width=True)
+        
+        def build_branch_chart(self, data: pd.DataFrame, title: str, key: str) -> go.Figure:
+            """
+            Siapkan data cabang dan buat grafik batangnya
+            """
+            category_column = f'Status_{key.capitalize()}'
+            try:
+                data = self.prepare_categorical_data(data, category_column)
+            except Exception as e:
+                st.error(f"Gagal memproses data untuk {key}: {e}")
+            return self.create_bar_chart(data, title, category_column)
+        
+        @st.fragment
+        def show_branch_charts(self, branch_results: Dict[str, pd.DataFrame]):
+            """
+            Region grafik batang per cabang
+            """
             # Tata letak grafik batang
             col7, col8 = st.columns(2)
             col9, col10 = st.columns(2)
             
             chart_columns = [col7, col8, col9, col10]
             
-            for (key, title), column in zip(bar_chart_configs, chart_columns):
+            for (key, title), column in zip(self.BAR_CHARTS, chart_columns):
                 with column:
-                    st.plotly_chart(
-                        self.create_bar_chart(
-                            processed_branch_data[key], 
-                            title, 
-                            f'Status_{key.capitalize()}'
-                        ), 
-                        use_container_width=True
+                    fig = self.branch_figure(key, title, branch_results[key])
+                    with self.instrumentation.span('render.plotly_chart', chart='bar'):
+                        st.plotly_chart(fig, use_container_width=True)
+        
+        def record_trend(self, cube: SLACountCube):
+            """
+            Tambahkan rollup harian cube ke trend store; kegagalan penulisan tidak menghentikan dashboard
+            """
+            if self.trend_store is None:
+                return
+            try:
+                with self.instrumentation.span('trend.record'):
+                    self.trend_store.record(cube)
+            except sqlite3.Error:
+                pass
+
+        @st.fragment
+        def show_trends(self, branches: Tuple[str, ...]):
+            """
+            Region tren SLA harian: persentase terakhir dengan selisih terhadap minggu lalu,
+            dan grafik garis per komponen dari rollup harian
+            """
+            st.subheader("Tren SLA")
+            days = st.selectbox("Rentang", [30, 90, 365], index=1, key='trend_days',
+                                format_func=lambda value: f"{value} hari terakhir")
+            try:
+                with self.instrumentation.span('trend.query') as span:
+                    data = self.trend_store.trend(branches, days)
+                    span.record(rows=len(data))
+            except (sqlite3.Error, pd.errors.DatabaseError) as e:
+                st.warning(f"Gagal membaca riwayat tren: {e}")
+                return
+            if data.empty:
+                st.caption("Belum ada riwayat tren untuk pilihan ini")
+                return
+
+            titles = {key: title for title, key in self.GAUGE_CHARTS}
+            latest = TrendStore.week_over_week(data)
+            for (title, key), column in zip(self.GAUGE_CHARTS, st.columns(len(self.GAUGE_CHARTS))):
+                if key in latest:
+                    value, delta = latest[key]
+                    column.metric(f"SLA {title}", f"{value:.1f}%",
+                                  delta=f"{delta:+.1f} poin vs minggu lalu" if delta is not None else None)
+
+            def build() -> go.Figure:
+                chart = data.assign(komponen=data['component'].map(titles))
+                fig = px.line(chart, x='day', y='persentase', color='komponen', markers=True,
+                              labels={'day': 'Tanggal', 'persentase': 'SLA (%)', 'komponen': 'Komponen'})
+                fig.update_layout(height=350, yaxis_range=[0, 100], margin=dict(l=20, r=20, t=30, b=20))
+                return fig
+
+            fig = self.cached_figure(('trend', frame_fingerprint(data)), build)
+            with self.instrumentation.span('render.plotly_chart', chart='trend'):
+                st.plotly_chart(fig, use_container_width=True)
+
+        def show_warmer_status(self):
+            """
+            Status warmer latar belakang, dan pemantau versi data yang memuat ulang halaman
+            begitu data baru selesai disiapkan
+            """
+            if self.warmer.running:
+                st.sidebar.caption("Data sedang diperbarui di latar belakang...")
+            elif self.warmer.last_error:
+                st.sidebar.caption(f"Pembaruan latar belakang gagal: {self.warmer.last_error}")
+            self.watch_data_version()
+        
+        @st.fragment(run_every=10)
+        def watch_data_version(self):
+            if st.session_state.get('data_generation') != self.result_cache.generation():
+                st.rerun()
+        
+        def show_cache_memory(self):
+            """
+            Tampilkan pemakaian memori cache sesi ini dan total semua sesi di sidebar
+            """
+            report = get_session_cache_registry().report()
+            with st.sidebar.expander("Memori Cache"):
+                st.write(f"Sesi ini: {format_bytes(st.session_state.sla_data.total_bytes())} di luar cache bersama "
+                         f"({len(st.session_state.sla_data)} entri)")
+                st.write(f"Semua sesi ({report['sessions']}): {format_bytes(report['unique_bytes'])} unik, "
+                         f"{format_bytes(report['referenced_bytes'])} dirujuk")
+                st.write(f"Entri: {report['entries']}, dibuang (LRU): {report['evictions']}")
+                shared = self.result_cache.stats()
+                st.write(f"Cache bersama: {format_bytes(shared['bytes'])} ({shared['entries']} entri, "
+                         f"dibuang: {shared['evictions']})")
+        
+        def show_diagnostics(self):
+            """
+            Panel diagnostik admin: durasi, baris dan byte per tahap serta statistik cache dan pool
+            """
+            with st.sidebar.expander("Diagnostik"):
+                if not self.instrumentation.enabled:
+                    st.caption("Instrumentasi nonaktif (aktifkan dengan SLA_METRICS=1)")
+                    return
+                if st.button("Reset Metrik", key="diagnostics_reset"):
+                    self.instrumentation.reset()
+                
+                st.markdown("**Per tahap**")
+                st.dataframe(self.instrumentation.stages(), hide_index=True)
+                
+                st.markdown("**Cache**")
+                for name, counts in self.instrumentation.cache_counts().items():
+                    total = counts['hit'] + counts['miss']
+                    st.write(f"{name}: {counts['hit']} hit / {counts['miss']} miss "
+                             f"({counts['hit'] / total:.0%} hit)" if total else f"{name}: -")
+                shared = self.result_cache.stats()
+                st.write(f"Cache bersama: {shared['entries']} entri ({format_bytes(shared['bytes'])}), "
+                         f"{shared['coalesced']} digabung, {shared['invalidations']} invalidasi, "
+                         f"{shared['evictions']} dibuang")
+                
+                pool = self.db_connection.pool.stats()
+                st.write(f"Pool koneksi: {pool['in_use']} dipakai, {pool['idle']} idle, "
+                         f"{pool['creations']} dibuat, {pool['waits']} menunggu, {pool['timeouts']} timeout")
+                st.write(f"Statement: {pool['prepared']} di-prepare, {pool['statement_reuse']} dipakai ulang")
+                
+                st.markdown("**Span terakhir**")
+                recent = self.instrumentation.recent()
+                if recent:
+                    st.dataframe(pd.DataFrame(recent[::-1])[['stage', 'seconds', 'rows', 'bytes', 'thread']],
+                                 hide_index=True)
+        
+        def get_sort_order(self, data: pd.DataFrame, branches: Tuple[str, ...], column: str, ascending: bool) -> np.ndarray:
+            """
+            Urutan baris (posisi) untuk kolom sort; dihitung sekali per data dan dipakai bersama
+            """
+            def compute() -> Tuple[Any, np.ndarray]:
+                values = data[column].reset_index(drop=True)
+                try:
+                    ordered = values.sort_values(ascending=ascending, na_position='last', kind='stable')
+                except TypeError:
+                    # Kolom dengan tipe campuran diurutkan sebagai teks
+                    ordered = values.astype('string').sort_values(ascending=ascending, na_position='last', kind='stable')
+                return weakref.ref(data), ordered.index.to_numpy()
+            
+            key = ('sort', branches, column, ascending)
+            source, order = self.result_cache.get_or_compute(key, compute)
+            if source() is not data:
+                # Urutan dibuat dari DataFrame lain (misalnya sebelum refresh): hitung ulang
+                self.result_cache.invalidate(key)
+                source, order = self.result_cache.get_or_compute(key, compute)
+            return order
+        
+        @st.fragment
+        def show_detail_table(self, data_detail: Optional[pd.DataFrame], branches: Tuple[str, ...]):
+            """
+            Tabel detail dengan paginasi di server: hanya halaman yang terlihat yang dikirim ke browser.
+            Sebagai fragment, ganti halaman/urutan/kolom hanya menjalankan ulang region ini
+            """
+            if data_detail is None or data_detail.empty:
+                st.info("Tidak ada data detail untuk cabang yang dipilih")
+                return
+            
+            # Kolom teknis watermark tidak ditampilkan
+            meta_columns = self.watermark.meta_columns if self.watermark else []
+            available_columns = [c for c in data_detail.columns if c not in meta_columns]
+            
+            st.subheader("Data Detail")
+            with st.expander("Pilih Kolom"):
+                selected_columns = st.multiselect(
+                    "Kolom yang ditampilkan",
+                    options=available_columns,
+                    default=available_columns,
+                    key="detail_columns"
+                )
+            columns = selected_columns or available_columns
+            
+            col_size, col_sort, col_order, col_page = st.columns([1, 2, 1, 1])
+            with col_size:
+                page_size = st.selectbox("Baris per halaman", [25, 50, 100, 250, 500], index=2, key="detail_page_size")
+            with col_sort:
+                sort_column = st.selectbox("Urutkan berdasarkan", ['(tanpa urutan)'] + available_columns, key="detail_sort")
+            with col_order:
+                ascending = st.radio("Urutan", ["Naik", "Turun"], horizontal=True, key="detail_order") == "Naik"
+            
+            # Jumlah baris diambil dari data yang sudah di-cache, tanpa COUNT(*) ke database
+            total_rows = len(data_detail)
+            total_pages = max(1, math.ceil(total_rows / page_size))
+            if st.session_state.get("detail_page", 1) > total_pages:
+                st.session_state.detail_page = total_pages
+            with col_page:
+                page = st.number_input("Halaman", min_value=1, max_value=total_pages, step=1, key="detail_page")
+            
+            start = (page - 1) * page_size
+            end = min(start + page_size, total_rows)
+            if sort_column == '(tanpa urutan)':
+                page_data = data_detail.iloc[start:end]
+            else:
+                order = self.get_sort_order(data_detail, branches, sort_column, ascending)
+                page_data = data_detail.iloc[order[start:end]]
+            
+            with self.instrumentation.span('render.dataframe') as span:
+                page_view = page_data[columns]
+                span.record_frame(page_view)
+                st.dataframe(page_view)
+            st.caption(f"Menampilkan baris {start + 1:,}-{end:,} dari {total_rows:,} (halaman {page} dari {total_pages})")
+            
+            self.show_export(data_detail, branches, columns)
+        
+        def data_version(self, data: pd.DataFrame) -> str:
+            """
+            Identitas versi data untuk cache file ekspor: file snapshot, atau versi cache bersama
+            """
+            snapshot = data.attrs.get('snapshot')
+            if snapshot is not None:
+                return snapshot['file']
+            return f"{os.getpid()}-{id(self.result_cache)}-{self.result_cache.generation()}"
+        
+        def show_export(self, data_detail: pd.DataFrame, branches: Tuple[str, ...], columns: List[str]):
+            """
+            Unduh data detail cabang terpilih dengan kolom yang dipilih di tabel. File dibuat
+            saat diminta dan dipakai ulang untuk versi data yang sama; jika static serving aktif,
+            file diunduh langsung dari disk tanpa dimuat ke memori server
+            """
+            if self.exporter is None:
+                return
+            with st.expander("Unduh Data"):
+                formats = self.exporter.available_formats()
+                fmt = st.radio("Format", formats, horizontal=True, key="export_format")
+                if 'XLSX' not in formats:
+                    st.caption("Format XLSX membutuhkan paket xlsxwriter")
+                extension, mime = DetailExporter.FORMATS[fmt]
+                version = self.data_version(data_detail)
+                label = f"{fmt} ({len(data_detail):,} baris, {len(columns)} kolom)"
+                
+                path = self.exporter.find(version, branches, columns, fmt)
+                if path is None:
+                    if not st.button(f"Siapkan {label}", key="export_prepare"):
+                        return
+                    with st.spinner("Menyiapkan file ekspor..."):
+                        with self.instrumentation.span(f'export.{extension}') as span:
+                            path = self.exporter.export(data_detail, version, branches, columns, fmt)
+                            span.record(len(data_detail), os.path.getsize(path))
+                size = os.path.getsize(path)
+                
+                url = self.exporter.url_for(path)
+                if url is not None:
+                    st.link_button(f"Unduh {label}, {format_bytes(size)}", url)
+                elif size <= DetailExporter.DOWNLOAD_MAX_BYTES:
+                    def read() -> bytes:
+                        with open(path, 'rb') as f:
+                            return f.read()
+                    
+                    # Tanpa static serving, isi file dikirim lewat media store di memori server
+                    st.download_button(
+                        f"Unduh {label}, {format_bytes(size)}",
+                        data=read,
+                        file_name=f"sla_hms_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                        mime=mime,
+                        on_click='ignore',
+                        key="export_download"
                     )
+                else:
+                    st.warning(f"File ekspor {format_bytes(size)} melebihi batas unduhan "
+                               f"{format_bytes(DetailExporter.DOWNLOAD_MAX_BYTES)}. Aktifkan "
+                               f"server.enableStaticServing atau kurangi cabang/kolom yang dipilih")
+        
+        def run_dashboard(self):
+            """
+            Metode utama untuk menjalankan Dashboard SLA
+            """
+            with self.instrumentation.span('dashboard.render'):
+                self.render_dashboard()
+            self.instrumentation.flush({
+                'pool': self.db_connection.pool.stats(),
+                'shared_cache': self.result_cache.stats(),
+                'session_cache': st.session_state.sla_data.stats(),
+            })
+
+        def render_dashboard(self):
+            # Ambil data detail semua cabang sekali per refresh, lalu bangun cube jumlah unit
+            data_all = self.load_all_detail()
+            cube = self.get_count_cube(data_all)
+            self.record_trend(cube)
             
-            # Tampilkan data detail
-            st.dataframe(data_detail)
+            # Tampilkan waktu dan umur snapshot data, atau waktu data dimuat jika tanpa snapshot
+            snapshot = data_all.attrs.get('snapshot') if data_all is not None else None
+            if snapshot is not None:
+                created_at = datetime.fromisoformat(snapshot['created_at'])
+                age = (datetime.now() - created_at).total_seconds()
+                st.sidebar.info(f"Snapshot data: {created_at.strftime('%d-%m-%Y %H:%M:%S')} ({format_age(age)})")
+                if snapshot.get('extracting'):
+                    st.sidebar.info("Snapshot baru sedang diekstrak oleh proses lain; sementara menampilkan snapshot sebelumnya")
+                elif snapshot.get('stale'):
+                    st.sidebar.warning("Database tidak dapat diakses; menampilkan snapshot terakhir")
+            else:
+                age = self.result_cache.age(('detail', ()))
+                loaded_at = datetime.fromtimestamp(time.time() - age) if age is not None else st.session_state.last_refresh_time
+                st.sidebar.info(f"Terakhir diperbarui: {loaded_at.strftime('%d-%m-%Y %H:%M:%S')}"
+                                + (f" ({format_age(age)})" if age is not None else ""))
+            if 'last_refresh_info' in st.session_state:
+                st.sidebar.caption(f"Refresh terakhir: {st.session_state.last_refresh_info}")
+            if self.warmer is not None:
+                self.show_warmer_status()
+            
+            # Pemakaian memori cache hanya ditampilkan untuk admin
+            if st.session_state.get("username") == "admin":
+                self.show_cache_memory()
+                self.show_diagnostics()
+            
+            # Dapatkan filter
+            filters = self.create_sidebar_filters(cube.branch_names())
+            branches = normalize_branch_selection(filters['selected_cabang'])
+            
+            # Gauge dan grafik cabang dijawab dari cube, tanpa query ke database
+            sla_percentages, branch_results = cube.query(branches)
+            data_detail = self.get_branch_detail(data_all, branches)
+            
+            # Region gauge, grafik cabang dan tabel detail dirender sebagai fragment terpisah
+            self.show_gauges(sla_percentages)
+            self.show_branch_charts(branch_results)
+            if self.trend_store is not None:
+                self.show_trends(branches)
+            
+            # Tampilkan data detail per halaman
+            self.show_detail_table(data_detail, branches)
 
 
     def main():
         """
         Fungsi utama untuk menginisialisasi dan menjalankan dashboard
         """
-        # Konfigurasi database
+        # Konfigurasi database SQL Server (bisa di-override lewat variabel lingkungan)
         db_config = {
-            'server': 'proddatapool.assa.id',
-            'database': 'prod_fleet_dw',
-            'username': 'fleetdw',
-            'password': 'AssarentDW.2024',
-            'driver': 'ODBC Driver 18 for SQL Server'
+            'server': os.environ.get('SLA_DB_SERVER', 'proddatapool.assa.id'),
+            'database': os.environ.get('SLA_DB_NAME', 'prod_fleet_dw'),
+            'username': os.environ.get('SLA_DB_USER', 'fleetdw'),
+            'password': os.environ.get('SLA_DB_PASSWORD', 'AssarentDW.2024'),
+            'driver': os.environ.get('SLA_DB_DRIVER', 'ODBC Driver 18 for SQL Server')
         }
         
-        # Buat koneksi database
-        db_connection = DatabaseConnection(**db_config)
+        # Buat koneksi database; SLA_BACKEND=sqlite/duckdb memakai file lokal di SLA_DB_PATH
+        backend = create_backend(**db_config)
+        # Instrumentasi per tahap (SLA_METRICS=0 untuk menonaktifkan); ekspor opsional ke
+        # file JSON lines (SLA_METRICS_JSONL) dan file teks Prometheus (SLA_METRICS_PROM)
+        instrumentation = get_instrumentation(
+            enabled=os.environ.get('SLA_METRICS', '1') != '0',
+            jsonl_path=os.environ.get('SLA_METRICS_JSONL'),
+            prometheus_path=os.environ.get('SLA_METRICS_PROM')
+        )
+        # Hasil query dibaca per batch 50.000 baris (SLA_FETCH_BATCH=0 untuk sekali baca)
+        db_connection = DatabaseConnection(
+            backend,
+            instrumentation=instrumentation,
+            batch_size=int(os.environ.get('SLA_FETCH_BATCH', 50_000)) or None,
+            pool=get_connection_pool(backend.cache_key(), backend, 10, instrumentation),
+            on_error=st.error
+        )
+        
+        snapshot_dir = os.environ.get('SLA_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot'))
+        
+        # Static serving Streamlit (server.enableStaticServing) melayani folder `static` di samping
+        # skrip; file ekspor ditaruh di sana agar diunduh langsung dari disk
+        static_dir = (os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+                      if st.get_option('server.enableStaticServing') else None)
         
         # Inisialisasi dan jalankan dashboard
-        dashboard = SLADashboard(db_connection)
+        # Hasil query disimpan bersama untuk semua sesi selama cache_ttl detik
+        # Cache per sesi dibatasi 8 entri dan 256 MB, cache bersama 64 entri dan 1 GB
+        # Refresh inkremental hanya jika sumber perubahan dikonfigurasi lewat SLA_WATERMARK
+        # (kolom waktu modifikasi, rowversion atau change tracking); default muat ulang penuh
+        dashboard = SLADashboard(
+            db_connection,
+            cache_ttl=600,
+            session_cache_entries=8,
+            session_cache_bytes=256 * 1024 ** 2,
+            shared_cache_entries=64,
+            shared_cache_bytes=1024 ** 3,
+            watermark=create_watermark(),
+            query_timeout=120,
+            query_workers=4,
+            # Snapshot lokal SLA_HMS dipakai bersama semua sesi dan proses, diperbarui tiap 10 menit
+            # (SLA_SNAPSHOT_DIR kosong: tanpa snapshot, query langsung ke database)
+            snapshot_store=get_snapshot_store(snapshot_dir, 600) if snapshot_dir else None,
+            instrumentation=instrumentation,
+            # Warmer latar belakang memperbarui data tiap 5 menit (SLA_WARM_INTERVAL=0 untuk menonaktifkan)
+            warm_interval=float(os.environ.get('SLA_WARM_INTERVAL', 300)) or None,
+            # File ekspor data detail (CSV/Parquet/XLSX) disimpan dan dipakai ulang per versi data
+            exporter=get_detail_exporter(
+                os.environ.get('SLA_EXPORT_DIR', os.path.join(static_dir or os.path.dirname(os.path.abspath(__file__)), 'exports')),
+                static_dir
+            ),
+            # Rollup SLA harian per cabang untuk grafik tren, ditulis setiap data diperbarui
+            trend_store=get_trend_store(
+                os.environ.get('SLA_TREND_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sla_trend.db'))
+            )
+        )
         dashboard.run_dashboard()
 
     # Pastikan skrip hanya dijalankan saat dieksekusi langsung
@@ -0,0 +1,8 @@
+"""
+Benchmark Dashboard SLA HMS: generator data armada sintetis, runner headless dan uji beban.
+
+Contoh:
+    python -m benchmarks.run --sizes 10000 100000 --backend sqlite --output hasil.json
+    python -m benchmarks.load --users 1 10 50 100 200 --latency 0.2 --output beban.json
+    python -m benchmarks.run --sizes 100000 --no-snapshot   # jalur query langsung (QueryExecutor)
+"""
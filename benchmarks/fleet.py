@@ -0,0 +1,168 @@
+"""
+Generator data SLA_HMS sintetis dengan distribusi yang mendekati data produksi:
+jumlah unit per cabang tidak merata, kualitas SLA berbeda per cabang, dan campuran A/T vs M/T
+"""
+import os
+import sqlite3
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+# Kolom sama dengan DETAIL_COLUMNS di sla_core.py
+FLEET_COLUMNS = [
+    'Nomor_Customer', 'Nama_Customer', 'Nama_Cabang', 'Nomor_Equipment', 'Nomor_Polisi',
+    'Kelompok_Model', 'kategori_unit', 'Tipe_Transmisi', 'km_harian', 'Last_KM_Update',
+    'Last_KM_ACCU', 'Last_Tgl_Release_ACCU_SPK', 'Konsumsi_ACCU', 'Indikator_ACCU',
+    'Status_ACCU', 'Tgl_Plan_Pergantian_ACCU', 'Last_KM_Kopling', 'Last_Tgl_Release_Kopling_SPK',
+    'Konsumsi_Kopling', 'Indikator_Kopling', 'Status_Kopling', 'Tgl_Plan_Pergantian_Kopling',
+    'Last_KM_Ban', 'Last_Tgl_Release_Ban_SPK', 'Konsumsi_Ban', 'Indikator_Ban', 'Status_Ban',
+    'Last_KM_PB', 'Tgl_Last_Service_PB', 'Selisih_KM_Service', 'Status_PB',
+    'Next_Plan_KM_Service', 'Tanggal_Plan_Service'
+]
+
+BRANCHES = [
+    'JAKARTA', 'SURABAYA', 'BANDUNG', 'MEDAN', 'SEMARANG', 'MAKASSAR', 'BALIKPAPAN', 'PALEMBANG',
+    'PEKANBARU', 'DENPASAR', 'YOGYAKARTA', 'MALANG', 'BATAM', 'BANJARMASIN', 'PONTIANAK', 'SAMARINDA',
+    'MANADO', 'PADANG', 'LAMPUNG', 'JAMBI', 'CIREBON', 'SOLO', 'KUPANG', 'JAYAPURA',
+    'MATARAM', 'KENDARI', 'PALU', 'AMBON', 'BENGKULU', 'SORONG'
+]
+
+MODELS = [
+    ('AVANZA', 'PC'), ('INNOVA', 'PC'), ('XPANDER', 'PC'), ('FORTUNER', 'PC'), ('PAJERO', 'PC'),
+    ('HILUX', 'LCV'), ('L300', 'LCV'), ('GRAN MAX', 'LCV'), ('TRITON', 'LCV'), ('ELF', 'TRUCK')
+]
+
+# Komponen SLA: (kolom KM terakhir, tanggal release SPK, konsumsi, indikator, status, tanggal plan)
+COMPONENTS = {
+    'ACCU': ('Last_KM_ACCU', 'Last_Tgl_Release_ACCU_SPK', 'Konsumsi_ACCU', 'Indikator_ACCU',
+             'Status_ACCU', 'Tgl_Plan_Pergantian_ACCU'),
+    'Kopling': ('Last_KM_Kopling', 'Last_Tgl_Release_Kopling_SPK', 'Konsumsi_Kopling', 'Indikator_Kopling',
+                'Status_Kopling', 'Tgl_Plan_Pergantian_Kopling'),
+    'Ban': ('Last_KM_Ban', 'Last_Tgl_Release_Ban_SPK', 'Konsumsi_Ban', 'Indikator_Ban',
+            'Status_Ban', None),
+}
+
+
+def branch_weights(n_branches: int) -> np.ndarray:
+    """
+    Porsi unit per cabang mengikuti distribusi Zipf: cabang besar jauh lebih banyak unitnya
+    """
+    weights = 1.0 / np.arange(1, n_branches + 1) ** 1.1
+    return weights / weights.sum()
+
+
+def generate_fleet(n_vehicles: int, seed: int = 0, chunk_size: int = 250_000,
+                   n_branches: int = len(BRANCHES), at_share: float = 0.35) -> Iterator[pd.DataFrame]:
+    """
+    Hasilkan data armada sebanyak `n_vehicles` unit dalam potongan `chunk_size` baris.
+    Hasilnya deterministik untuk `seed` yang sama
+    """
+    branches = np.array(BRANCHES[:n_branches], dtype=object)
+    weights = branch_weights(len(branches))
+    # Peluang status OK per cabang: sebagian besar cabang baik, beberapa tertinggal
+    branch_ok = np.random.default_rng(seed).beta(8, 2, size=len(branches))
+    n_customers = max(1, n_vehicles // 40)
+    models = np.array([m for m, _ in MODELS], dtype=object)
+    categories = np.array([c for _, c in MODELS], dtype=object)
+    today = np.datetime64('2026-10-17', 'D')
+
+    for start in range(0, n_vehicles, chunk_size):
+        n = min(chunk_size, n_vehicles - start)
+        rng = np.random.default_rng([seed, start])
+        index = np.arange(start, start + n)
+        branch = rng.choice(len(branches), size=n, p=weights)
+        customer = rng.integers(0, n_customers, size=n)
+        model = rng.integers(0, len(models), size=n)
+        automatic = rng.random(n) < at_share
+
+        km_harian = np.round(rng.gamma(2.0, 60.0, size=n)).astype(np.int64)
+        last_km = rng.integers(5_000, 300_000, size=n)
+
+        data = {
+            'Nomor_Customer': np.char.add('C', customer.astype(str)).astype(object),
+            'Nama_Customer': np.char.add('PT PELANGGAN ', customer.astype(str)).astype(object),
+            'Nama_Cabang': branches[branch],
+            'Nomor_Equipment': np.char.add('EQ', np.char.zfill(index.astype(str), 9)).astype(object),
+            'Nomor_Polisi': np.char.add('B ', np.char.zfill((index % 10_000).astype(str), 4)).astype(object),
+            'Kelompok_Model': models[model],
+            'kategori_unit': categories[model],
+            'Tipe_Transmisi': np.where(automatic, 'A/T', 'M/T').astype(object),
+            'km_harian': km_harian,
+            'Last_KM_Update': last_km,
+        }
+
+        for name, (km_col, release_col, usage_col, indicator_col, status_col, plan_col) in COMPONENTS.items():
+            usage = rng.integers(0, 60_000, size=n)
+            ok = rng.random(n) < branch_ok[branch]
+            status = np.where(ok, 'OK', 'NOT OK').astype(object)
+            # Sebagian unit belum punya riwayat komponen (status NULL)
+            status[rng.random(n) < 0.04] = None
+            if name == 'Kopling':
+                # Unit A/T umumnya tidak punya data kopling
+                status[automatic & (rng.random(n) < 0.9)] = None
+            data[km_col] = last_km - np.minimum(usage, last_km)
+            data[release_col] = today - rng.integers(0, 720, size=n).astype('timedelta64[D]')
+            data[usage_col] = np.minimum(usage, last_km).astype(np.float64)
+            data[indicator_col] = np.where(ok, 'HIJAU', np.where(rng.random(n) < 0.5, 'KUNING', 'MERAH')).astype(object)
+            data[status_col] = status
+            if plan_col is not None:
+                data[plan_col] = today + rng.integers(-60, 365, size=n).astype('timedelta64[D]')
+
+        service_gap = rng.integers(0, 15_000, size=n)
+        pb_ok = rng.random(n) < branch_ok[branch]
+        status_pb = np.where(pb_ok, 'OK', 'NOT OK').astype(object)
+        status_pb[rng.random(n) < 0.03] = None
+        data['Last_KM_PB'] = last_km - np.minimum(service_gap, last_km)
+        data['Tgl_Last_Service_PB'] = today - rng.integers(0, 365, size=n).astype('timedelta64[D]')
+        data['Selisih_KM_Service'] = service_gap
+        data['Status_PB'] = status_pb
+        data['Next_Plan_KM_Service'] = (last_km // 10_000 + 1) * 10_000
+        data['Tanggal_Plan_Service'] = today + rng.integers(0, 120, size=n).astype('timedelta64[D]')
+
+        frame = pd.DataFrame(data)
+        for column in frame.columns:
+            if frame[column].dtype.kind == 'M':
+                frame[column] = frame[column].astype('datetime64[s]')
+        yield frame[FLEET_COLUMNS]
+
+
+def write_fleet(path: str, n_vehicles: int, backend: str = 'sqlite', seed: int = 0,
+                chunk_size: int = 250_000, table: str = 'SLA_HMS') -> int:
+    """
+    Tulis armada sintetis ke file SQLite atau DuckDB; mengembalikan jumlah baris yang ditulis
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    written = 0
+    if backend == 'sqlite':
+        with sqlite3.connect(path) as conn:
+            for frame in generate_fleet(n_vehicles, seed=seed, chunk_size=chunk_size):
+                frame.to_sql(table, conn, if_exists='append' if written else 'replace', index=False)
+                written += len(frame)
+    elif backend == 'duckdb':
+        import duckdb
+        with duckdb.connect(path) as conn:
+            for frame in generate_fleet(n_vehicles, seed=seed, chunk_size=chunk_size):
+                conn.register('fleet_chunk', frame)
+                if written:
+                    conn.execute(f"INSERT INTO {table} SELECT * FROM fleet_chunk")
+                else:
+                    conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM fleet_chunk")
+                conn.unregister('fleet_chunk')
+                written += len(frame)
+    else:
+        raise ValueError(f"Backend tidak dikenal: {backend}")
+    return written
+
+
+def parse_sizes(values: List[str]) -> List[int]:
+    """
+    Ukuran armada dari argumen CLI; mendukung akhiran k dan M (mis. 10k, 5M)
+    """
+    sizes = []
+    for value in values:
+        value = value.strip()
+        multiplier = {'k': 1_000, 'K': 1_000, 'm': 1_000_000, 'M': 1_000_000}.get(value[-1:], 1)
+        sizes.append(int(float(value[:-1] if multiplier > 1 else value) * multiplier))
+    return sizes
@@ -0,0 +1,378 @@
+"""
+Uji beban multi-pengguna Dashboard SLA HMS: N sesi headless (Streamlit AppTest) berjalan bersamaan
+dalam satu proses server. Setiap sesi login lewat login_page, lalu mengganti filter cabang, menggeser
+halaman tabel detail dan menekan Refresh, terhadap backend lokal dengan latensi query buatan.
+
+Laporan per jumlah pengguna: throughput render, latensi render p50/p95/p99 (total dan per aksi),
+query database per detik dan memori proses. Setiap jumlah pengguna dijalankan di proses terpisah
+agar cache dan puncak RSS tidak tercampur. Klien AppTest berjalan di proses yang sama dengan
+server, sehingga latensi juga mencakup pemrosesan hasil render di sisi klien: angka ini untuk
+membandingkan perubahan kode dan tren saat pengguna bertambah, bukan angka absolut produksi.
+
+Contoh:
+    python -m benchmarks.load --users 1 10 50 200 --vehicles 50k --latency 0.2 --output beban.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks import run
+from benchmarks.fleet import parse_sizes, write_fleet
+
+# Bobot aksi setelah login: ganti filter cabang, halaman berikutnya tabel detail, tombol Refresh
+ACTIONS = {'filter': 0.45, 'page': 0.45, 'refresh': 0.10}
+
+
+class LatencyLog:
+    """
+    Catatan latensi render per aksi dari semua sesi (thread-safe). Kegagalan harness (AppTest atau
+    skrip uji, bukan aplikasi) dicatat terpisah dan tidak ikut dalam sampel latensi
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.harness_errors: Dict[str, int] = {}
+
+    def add(self, action: str, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            self.samples.setdefault(action, []).append(seconds)
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def add_harness_error(self, action: str, error: str):
+        with self._lock:
+            message = f"{action}: {error}"
+            self.harness_errors[message] = self.harness_errors.get(message, 0) + 1
+
+
+class MemorySampler(threading.Thread):
+    """
+    Ambil sampel RSS proses secara berkala selama uji beban berjalan
+    """
+    def __init__(self, interval: float = 0.2):
+        super().__init__(name='memory-sampler', daemon=True)
+        self.interval = interval
+        self.peak = run.rss_bytes()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, run.rss_bytes())
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        return max(self.peak, run.rss_bytes())
+
+
+def share_runtime():
+    """
+    AppTest memasang Runtime tiruan di awal setiap run dan melepasnya lagi di akhir run. Dengan
+    banyak sesi bersamaan, sesi yang selesai lebih dulu ikut melepas runtime sesi lain yang masih
+    berjalan; di sini runtime terakhir tetap dipakai selama proses uji beban hidup
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+
+    # Opsi ini dipasang/dipulihkan per run oleh AppTest; dipasang permanen agar tidak saling menimpa
+    config.set_option('global.appTest', True)
+    last: List[Any] = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        if not last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last[0]
+
+    def exists(cls) -> bool:
+        return cls._instance is not None or bool(last)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def share_bytecode():
+    """
+    AppTest membuat ScriptCache baru di setiap run, sehingga skrip dikompilasi ulang di setiap rerun.
+    Kompilasi bersamaan dari banyak thread bisa gagal di beberapa versi CPython (mis. `SystemError:
+    AST constructor recursion depth mismatch` di 3.11.7); di sini skrip dikompilasi sekali di bawah
+    lock dan bytecode-nya dipakai bersama, seperti ScriptCache milik server Streamlit sungguhan
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    compile_script = ScriptCache.get_bytecode
+    lock = threading.Lock()
+    shared: Dict[str, Any] = {}
+
+    def get_bytecode(self, script_path: str) -> Any:
+        path = os.path.abspath(script_path)
+        with lock:
+            if path not in shared:
+                shared[path] = compile_script(self, path)
+            return shared[path]
+
+    ScriptCache.get_bytecode = get_bytecode
+    # Kompilasi sekarang, sebelum sesi-sesi dimulai
+    ScriptCache().get_bytecode(run.APP_PATH)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(values),
+        'mean_s': round(float(values.mean()), 4),
+        'p50_s': round(float(p50), 4),
+        'p95_s': round(float(p95), 4),
+        'p99_s': round(float(p99), 4),
+        'max_s': round(float(values.max()), 4),
+    }
+
+
+def app_error(app: Any) -> Optional[str]:
+    """
+    Exception atau st.error pertama yang dirender sesi, jika ada
+    """
+    for element in list(app.exception) + list(app.error):
+        return str(element.value).splitlines()[0][:200]
+    return None
+
+
+def timed(log: LatencyLog, action: str, app: Any, step):
+    """
+    Ukur satu aksi. Exception atau st.error yang dirender aplikasi dihitung sebagai error aplikasi;
+    exception dari harness tanpa error di aplikasi dihitung sebagai kegagalan harness
+    """
+    start = time.perf_counter()
+    try:
+        step()
+    except Exception as e:
+        seconds = time.perf_counter() - start
+        error = app_error(app)
+        if error is None:
+            log.add_harness_error(action, f"{type(e).__name__}: {e}")
+        else:
+            log.add(action, seconds, error)
+        return
+    log.add(action, time.perf_counter() - start, app_error(app))
+
+
+def logged_in(app: Any) -> bool:
+    return 'logged_in' in app.session_state and bool(app.session_state['logged_in'])
+
+
+def login(app: Any, username: str, password: str):
+    """
+    Buka halaman login dan kirim form seperti pengguna (login_page lalu st.rerun ke dashboard).
+    Login yang ditolak aplikasi terlihat sebagai st.error di halaman login
+    """
+    app.text_input[0].input(username)
+    app.text_input[1].input(password)
+    app.button[0].click().run()
+    if not logged_in(app):
+        raise RuntimeError("Login gagal")
+
+
+def next_page(app: Any):
+    pages = [widget for widget in app.number_input if widget.key == 'detail_page']
+    if not pages:
+        # Data muat dalam satu halaman: tidak ada pemilih halaman, cukup rerun
+        app.run()
+        return
+    page = pages[0]
+    last = page.max or page.value
+    page.set_value(page.value + 1 if page.value < last else 1).run()
+
+
+def choose_branches(app: Any, rng: random.Random):
+    select = app.sidebar.multiselect[0]
+    branches = [option for option in select.options if option != 'All']
+    if not branches or rng.random() < 0.2:
+        select.set_value(['All']).run()
+    else:
+        select.set_value(rng.sample(branches, min(len(branches), rng.randint(1, 3)))).run()
+
+
+def run_user(index: int, n_users: int, args: argparse.Namespace, log: LatencyLog, start: threading.Barrier):
+    """
+    Satu pengguna: login, lalu `args.actions` aksi acak (deterministik per seed dan indeks)
+    dengan jeda berpikir `args.think` detik
+    """
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(args.seed * 100_003 + index)
+    app = AppTest.from_file(run.APP_PATH, default_timeout=args.timeout)
+    start.wait()
+    if args.ramp:
+        time.sleep(args.ramp * index / n_users)
+
+    timed(log, 'login_page', app, app.run)
+    timed(log, 'login', app, lambda: login(app, args.username, args.password))
+    if not logged_in(app):
+        return
+    steps = {
+        'filter': lambda: choose_branches(app, rng),
+        'page': lambda: next_page(app),
+        'refresh': lambda: app.button(key='unique_refresh_button').click().run(),
+    }
+    for _ in range(args.actions):
+        if args.think:
+            time.sleep(rng.uniform(0, 2 * args.think))
+        action = rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        timed(log, action, app, steps[action])
+
+
+def run_level(n_users: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Jalankan `n_users` sesi bersamaan dan ringkas hasilnya
+    """
+    log = LatencyLog()
+    barrier = threading.Barrier(n_users + 1)
+    threads = [threading.Thread(target=run_user, args=(i, n_users, args, log, barrier), name=f'user-{i}')
+               for i in range(n_users)]
+    for thread in threads:
+        thread.start()
+
+    sampler = MemorySampler()
+    rss_start = run.rss_bytes()
+    before = run.COUNTER.snapshot()
+    sampler.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    rss_peak = sampler.stop()
+    after = run.COUNTER.snapshot()
+
+    renders = [seconds for samples in log.samples.values() for seconds in samples]
+    queries = after['queries'] - before['queries']
+    return {
+        'users': n_users,
+        'wall_s': round(wall, 3),
+        'renders': len(renders),
+        'throughput_rps': round(len(renders) / wall, 3) if wall else None,
+        'latency': latency_summary(renders),
+        'latency_by_action': {action: latency_summary(samples) for action, samples in log.samples.items()},
+        'errors': sum(log.errors.values()),
+        'error_messages': dict(sorted(log.errors.items(), key=lambda item: -item[1])[:5]),
+        'harness_errors': sum(log.harness_errors.values()),
+        'harness_error_messages': dict(sorted(log.harness_errors.items(), key=lambda item: -item[1])[:5]),
+        'db_queries': queries,
+        'db_qps': round(queries / wall, 3) if wall else None,
+        'db_rows': after['rows'] - before['rows'],
+        'rss_start_bytes': rss_start,
+        'rss_peak_bytes': rss_peak,
+        'rss_end_bytes': run.rss_bytes(),
+        'peak_rss_bytes': run.peak_rss_bytes(),
+    }
+
+
+def run_worker(args: argparse.Namespace):
+    """
+    Proses anak: satu tingkat jumlah pengguna terhadap file data yang sudah dibuat
+    """
+    run.prepare_worker(args.backend, args.db_path, args.snapshot_dir, args.latency, snapshot=not args.no_snapshot)
+    share_runtime()
+    share_bytecode()
+    json.dump(run_level(args.users[0], args), sys.stdout)
+
+
+def run_users(n_users: int, args: argparse.Namespace, db_path: str, workdir: str) -> Dict[str, Any]:
+    """
+    Jalankan satu tingkat jumlah pengguna di proses anak (cache dingin, seperti awal lonjakan)
+    """
+    command = [
+        sys.executable, '-m', 'benchmarks.load', '--worker',
+        '--users', str(n_users),
+        '--backend', args.backend,
+        '--db-path', db_path,
+        '--snapshot-dir', os.path.join(workdir, f'snapshot_{n_users}'),
+        '--latency', str(args.latency),
+        '--actions', str(args.actions),
+        '--think', str(args.think),
+        '--ramp', str(args.ramp),
+        '--seed', str(args.seed),
+        '--timeout', str(args.timeout),
+        '--username', args.username,
+        '--password', args.password,
+    ] + (['--no-snapshot'] if args.no_snapshot else [])
+    proc = subprocess.run(command, cwd=run.REPO_DIR, env=run.worker_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'users': n_users, 'error': proc.stderr.strip().splitlines()[-1:] or ['proses uji beban gagal']}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Uji beban multi-pengguna Dashboard SLA HMS')
+    parser.add_argument('--users', nargs='+', type=int, default=[1, 10, 50, 100, 200],
+                        help='Jumlah sesi bersamaan per tingkat')
+    parser.add_argument('--vehicles', default='20k', help='Jumlah unit data sintetis, mis. 20k atau 1M')
+    parser.add_argument('--backend', choices=['sqlite', 'duckdb'], default='sqlite')
+    parser.add_argument('--latency', type=float, default=0.1, help='Latensi buatan per query (detik)')
+    parser.add_argument('--actions', type=int, default=6, help='Jumlah aksi per sesi setelah login')
+    parser.add_argument('--think', type=float, default=0.5, help='Rata-rata jeda antar aksi (detik)')
+    parser.add_argument('--ramp', type=float, default=0.0, help='Sesi dimulai bertahap selama N detik')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600.0, help='Batas waktu per rerun AppTest (detik)')
+    parser.add_argument('--username', default='user')
+    parser.add_argument('--password', default='fleetho')
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help='Tanpa snapshot lokal: data diambil langsung dari database')
+    parser.add_argument('--workdir', help='Direktori data sintetis (default: direktori sementara)')
+    parser.add_argument('--output', help='File JSON hasil (default: stdout)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--db-path', help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    n_vehicles = parse_sizes([args.vehicles])[0]
+    with tempfile.TemporaryDirectory(prefix='sla_load_', dir=args.workdir) as workdir:
+        db_path = os.path.join(workdir, 'sla.duckdb' if args.backend == 'duckdb' else 'sla.db')
+        write_fleet(db_path, n_vehicles, backend=args.backend, seed=args.seed)
+        results = [run_users(n, args, db_path, workdir) for n in args.users]
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'backend': args.backend,
+            'snapshot': not args.no_snapshot,
+            'vehicles': n_vehicles,
+            'latency_s': args.latency,
+            'actions_per_user': args.actions,
+            'think_s': args.think,
+            'ramp_s': args.ramp,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+Jalankan Dashboard SLA HMS secara headless (Streamlit AppTest) terhadap backend lokal
+dan laporkan waktu per rerun, jumlah query, baris yang ditransfer, puncak RSS dan rasio cache hit.
+
+Setiap ukuran armada dijalankan di proses terpisah agar puncak RSS dan cache proses tidak tercampur.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fleet import parse_sizes, write_fleet
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'Dashboard_HMS.py')
+PING_QUERY = 'SELECT 1'
+# Latensi buatan per query (detik), untuk meniru database gudang data yang jauh
+QUERY_LATENCY = 0.0
+
+
+class QueryCounter:
+    """
+    Penghitung query dan baris yang diambil dari backend lokal (thread-safe)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.rows = 0
+
+    def add(self, queries: int = 0, rows: int = 0):
+        with self._lock:
+            self.queries += queries
+            self.rows += rows
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {'queries': self.queries, 'rows': self.rows}
+
+
+COUNTER = QueryCounter()
+
+
+def count_query(sql: str):
+    """
+    Catat satu query (kecuali ping pool) dan tunggu sesuai latensi buatan
+    """
+    if sql.strip() != PING_QUERY:
+        COUNTER.add(queries=1)
+        if QUERY_LATENCY:
+            time.sleep(QUERY_LATENCY)
+
+
+class CountingCursor(sqlite3.Cursor):
+    def execute(self, sql, *args, **kwargs):
+        count_query(sql)
+        return super().execute(sql, *args, **kwargs)
+
+    def fetchall(self):
+        rows = super().fetchall()
+        COUNTER.add(rows=len(rows))
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        COUNTER.add(rows=len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args, **kwargs):
+        return self.cursor().execute(sql, *args, **kwargs)
+
+
+class CountingDuckDB:
+    """
+    Pembungkus koneksi DuckDB yang menghitung query dan baris hasil .df()
+    """
+    def __init__(self, conn: Any):
+        self._conn = conn
+
+    def execute(self, sql, *args, **kwargs):
+        count_query(sql)
+        self._conn.execute(sql, *args, **kwargs)
+        return self
+
+    def df(self):
+        data = self._conn.df()
+        COUNTER.add(rows=len(data))
+        return data
+
+    def cursor(self):
+        # Dashboard menjalankan query lewat cursor per statement dari pool
+        return CountingDuckDB(self._conn.cursor())
+
+    def fetch_record_batch(self, *args, **kwargs):
+        for batch in self._conn.fetch_record_batch(*args, **kwargs):
+            COUNTER.add(rows=batch.num_rows)
+            yield batch
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+def install_counters(backend: str, db_path: str, latency: float = 0.0):
+    """
+    Pasang penghitung pada fungsi connect milik driver lokal sebelum dashboard membuat pool.
+    Hanya koneksi ke file data benchmark yang dihitung (bukan mis. trend store lokal).
+    `latency` ditambahkan ke setiap query ke file data tersebut
+    """
+    global QUERY_LATENCY
+    QUERY_LATENCY = latency
+    if backend == 'sqlite':
+        connect = sqlite3.connect
+
+        def counting_connect(database, *args, **kwargs):
+            if os.fspath(database) == db_path:
+                kwargs['factory'] = CountingConnection
+            return connect(database, *args, **kwargs)
+
+        sqlite3.connect = counting_connect
+    elif backend == 'duckdb':
+        import duckdb
+        connect = duckdb.connect
+        duckdb.connect = lambda *args, **kwargs: CountingDuckDB(connect(*args, **kwargs))
+
+
+def rss_bytes() -> int:
+    """
+    RSS proses saat ini (Linux), atau 0 jika tidak tersedia
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam KB di Linux dan dalam byte di macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def session_cache_stats(app: Any) -> Dict[str, int]:
+    return app.session_state['sla_data'].stats() if 'sla_data' in app.session_state else {}
+
+
+def measure(name: str, app: Any, action) -> Dict[str, Any]:
+    """
+    Jalankan satu langkah (aksi + rerun) dan catat metriknya
+    """
+    before = COUNTER.snapshot()
+    cache_before = session_cache_stats(app)
+    start = time.perf_counter()
+    action()
+    wall = time.perf_counter() - start
+    after = COUNTER.snapshot()
+
+    cache = session_cache_stats(app)
+    hits = cache.get('hits', 0) - cache_before.get('hits', 0)
+    misses = cache.get('misses', 0) - cache_before.get('misses', 0)
+    return {
+        'step': name,
+        'wall_s': round(wall, 4),
+        'queries': after['queries'] - before['queries'],
+        'rows': after['rows'] - before['rows'],
+        'rss_bytes': rss_bytes(),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'session_cache_hits': hits,
+        'session_cache_misses': misses,
+        'session_cache_hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        'session_cache_bytes': cache.get('bytes', 0),
+        'exceptions': [str(e.value) for e in app.exception],
+        'errors': [str(e.value) for e in app.error],
+    }
+
+
+def new_session(timeout: float) -> Any:
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.session_state['logged_in'] = True
+    app.session_state['username'] = 'benchmark'
+    return app
+
+
+def run_scenario(timeout: float) -> List[Dict[str, Any]]:
+    """
+    Skenario: muat awal, rerun tanpa perubahan, filter cabang, paging, urutkan,
+    sesi kedua (cache bersama/snapshot) dan tombol Refresh
+    """
+    app = new_session(timeout)
+    steps = [measure('cold_load', app, app.run)]
+    steps.append(measure('rerun', app, app.run))
+
+    branches = [option for option in app.sidebar.multiselect[0].options if option != 'All'] \
+        if len(app.sidebar.multiselect) else []
+    if branches:
+        steps.append(measure('filter_branches', app,
+                             lambda: app.sidebar.multiselect[0].set_value(branches[:3]).run()))
+    if len(app.number_input):
+        steps.append(measure('next_page', app, lambda: app.number_input(key='detail_page').set_value(2).run()))
+    if len(app.selectbox):
+        steps.append(measure('sort', app, lambda: app.selectbox(key='detail_sort').set_value('km_harian').run()))
+
+    second = new_session(timeout)
+    steps.append(measure('second_session', second, second.run))
+    steps.append(measure('refresh', app, lambda: app.button(key='unique_refresh_button').click().run()))
+    return steps
+
+
+def prepare_worker(backend: str, db_path: str, snapshot_dir: str, latency: float = 0.0, snapshot: bool = True):
+    """
+    Arahkan dashboard ke backend lokal dan file kerja sementara, lalu pasang penghitung query.
+    `snapshot` False mematikan snapshot lokal agar data diambil lewat QueryExecutor
+    """
+    os.chdir(REPO_DIR)
+    os.environ['SLA_BACKEND'] = backend
+    os.environ['SLA_DB_PATH'] = db_path
+    os.environ['SLA_SNAPSHOT_DIR'] = snapshot_dir if snapshot else ''
+    os.environ['SLA_EXPORT_DIR'] = os.path.join(snapshot_dir, 'exports')
+    os.environ['SLA_TREND_DB'] = os.path.join(snapshot_dir, 'sla_trend.db')
+    install_counters(backend, db_path, latency)
+
+
+def run_worker(args: argparse.Namespace):
+    """
+    Proses anak: jalankan skenario untuk satu file data dan cetak hasilnya sebagai JSON
+    """
+    prepare_worker(args.backend, args.db_path, args.snapshot_dir, snapshot=not args.no_snapshot)
+    steps = run_scenario(args.timeout)
+    json.dump({'steps': steps}, sys.stdout)
+
+
+def worker_env() -> Dict[str, str]:
+    """
+    Lingkungan proses anak: repo ada di PYTHONPATH agar `benchmarks` bisa diimpor
+    """
+    return {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')]))}
+
+
+def run_size(n_vehicles: int, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """
+    Buat data sintetis untuk satu ukuran armada dan jalankan skenario di proses anak
+    """
+    extension = 'duckdb' if args.backend == 'duckdb' else 'db'
+    db_path = os.path.join(workdir, f'sla_{n_vehicles}.{extension}')
+    start = time.perf_counter()
+    write_fleet(db_path, n_vehicles, backend=args.backend, seed=args.seed)
+    generate_s = time.perf_counter() - start
+
+    command = [
+        sys.executable, '-m', 'benchmarks.run', '--worker',
+        '--backend', args.backend,
+        '--db-path', db_path,
+        '--snapshot-dir', os.path.join(workdir, f'snapshot_{n_vehicles}'),
+        '--timeout', str(args.timeout),
+    ] + (['--no-snapshot'] if args.no_snapshot else [])
+    proc = subprocess.run(command, cwd=REPO_DIR, env=worker_env(), capture_output=True, text=True)
+    result: Dict[str, Any] = {'vehicles': n_vehicles, 'generate_s': round(generate_s, 3),
+                              'db_bytes': os.path.getsize(db_path)}
+    if proc.returncode != 0:
+        result['error'] = proc.stderr.strip().splitlines()[-1:] or ['proses benchmark gagal']
+        return result
+    result.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark Dashboard SLA HMS dengan data armada sintetis')
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k', '1M'],
+                        help='Jumlah unit per run, mis. 10k 100k 1M 5M')
+    parser.add_argument('--backend', choices=['sqlite', 'duckdb'], default='sqlite')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600.0, help='Batas waktu per rerun AppTest (detik)')
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help='Tanpa snapshot lokal: data diambil langsung dari database')
+    parser.add_argument('--workdir', help='Direktori data sintetis (default: direktori sementara)')
+    parser.add_argument('--output', help='File JSON hasil (default: stdout)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--db-path', help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='sla_bench_', dir=args.workdir) as workdir:
+        results = [run_size(n, args, workdir) for n in parse_sizes(args.sizes)]
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'backend': args.backend,
+            'snapshot': not args.no_snapshot,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2123 @@
+"""
+Komponen non-UI dashboard SLA: pool koneksi, backend query, instrumentasi, cube agregasi,
+refresh inkremental, cache, snapshot, ekspor, trend store dan cache warmer.
+Modul ini tidak bergantung pada Streamlit sehingga bisa diimpor dan diuji terpisah.
+"""
+import os
+import hashlib
+import json
+import math
+import secrets
+import sys
+import threading
+import time
+import weakref
+import sqlite3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import plotly.graph_objects as go
+from typing import List, Optional, Dict, Any, Tuple, Callable, Iterator, Sequence
+from datetime import datetime, date, timedelta
+from contextlib import closing, contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# pyodbc hanya dibutuhkan untuk backend SQL Server; backend lokal (SQLite/DuckDB) bisa jalan tanpanya
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+
+class PoolTimeoutError(Exception):
+    """Tidak ada koneksi yang tersedia di pool dalam batas waktu tunggu"""
+
+class ConnectionPool:
+    def __init__(self, connect: Callable[[], Any], max_size: int = 10, timeout: float = 30.0,
+                 pre_ping: bool = True, max_idle: Optional[float] = 300.0, ping_query: str = "SELECT 1",
+                 max_statements: int = 32, reset: Optional[Callable[[Any], None]] = None):
+        """
+        Pool koneksi yang thread-safe dan dibatasi jumlahnya.
+        `connect` adalah fungsi pembuat koneksi DB-API (pyodbc, sqlite3, dll.), `reset`
+        membersihkan koneksi saat dikembalikan (default: rollback).
+        Tiap koneksi menyimpan paling banyak `max_statements` cursor statement (lihat statement_cursor)
+        """
+        self._connect = connect
+        self._reset = reset or (lambda conn: conn.rollback())
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.max_idle = max_idle
+        self.ping_query = ping_query
+        self.max_statements = max_statements
+        self._condition = threading.Condition()
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        # Cursor per koneksi (id koneksi -> teks statement -> cursor), urut LRU
+        self._statements: Dict[int, OrderedDict] = {}
+        self._stats = {
+            'hits': 0,
+            'waits': 0,
+            'creations': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'prepared': 0,
+            'statement_reuse': 0,
+        }
+
+    def _close_quietly(self, conn: Any):
+        with self._condition:
+            cursors = self._statements.pop(id(conn), None)
+        for cursor in (cursors or {}).values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def statement_cursor(self, conn: Any, statement: str) -> Any:
+        """
+        Cursor khusus untuk satu teks statement pada koneksi yang sedang dipinjam.
+        Driver seperti pyodbc tidak melakukan prepare ulang jika teks yang sama dijalankan
+        lagi pada cursor yang sama, sehingga query berparameter cukup di-prepare sekali per koneksi
+        """
+        with self._condition:
+            cursors = self._statements.setdefault(id(conn), OrderedDict())
+            cursor = cursors.get(statement)
+            if cursor is not None:
+                cursors.move_to_end(statement)
+                self._stats['statement_reuse'] += 1
+                return cursor
+            self._stats['prepared'] += 1
+        cursor = conn.cursor()
+        evicted = None
+        with self._condition:
+            cursors[statement] = cursor
+            if len(cursors) > self.max_statements:
+                _, evicted = cursors.popitem(last=False)
+        if evicted is not None:
+            try:
+                evicted.close()
+            except Exception:
+                pass
+        return cursor
+
+    def _ping(self, conn: Any) -> bool:
+        """
+        Validasi koneksi sebelum dipinjamkan
+        """
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.ping_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _forget(self, conn: Any):
+        """
+        Tutup koneksi dan bebaskan slotnya di pool
+        """
+        self._close_quietly(conn)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def acquire(self) -> Any:
+        """
+        Pinjam koneksi dari pool; buat koneksi baru jika pool belum penuh,
+        atau tunggu sampai ada koneksi yang dikembalikan
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            candidate = None
+            create = False
+            with self._condition:
+                while candidate is None and not create:
+                    now = time.monotonic()
+                    while self._idle:
+                        conn, last_used = self._idle.pop()
+                        if self.max_idle is not None and now - last_used > self.max_idle:
+                            self._stats['recycled'] += 1
+                            self._size -= 1
+                            self._close_quietly(conn)
+                            continue
+                        candidate = conn
+                        break
+                    if candidate is not None:
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Semua {self.max_size} koneksi sedang dipakai (menunggu {self.timeout} detik)"
+                        )
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                    self._condition.wait(remaining)
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._stats['creations'] += 1
+                return conn
+
+            # Validasi di luar lock agar peminjam lain tidak ikut menunggu
+            if self.pre_ping and not self._ping(candidate):
+                with self._condition:
+                    self._stats['ping_failures'] += 1
+                self._forget(candidate)
+                continue
+            with self._condition:
+                self._stats['hits'] += 1
+            return candidate
+
+    def release(self, conn: Any, discard: bool = False):
+        """
+        Kembalikan koneksi ke pool; koneksi yang bermasalah dibuang
+        """
+        if not discard:
+            try:
+                # Bersihkan transaksi yang mungkin masih terbuka
+                self._reset(conn)
+            except Exception:
+                discard = True
+        if discard:
+            with self._condition:
+                self._stats['discarded'] += 1
+            self._forget(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Context manager untuk meminjam dan mengembalikan koneksi
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # Termasuk GeneratorExit saat pembacaan batch dihentikan di tengah jalan
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Statistik pool: hits, waits, creations, dll. beserta ukuran saat ini
+        """
+        with self._condition:
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+            }
+
+class Span:
+    """
+    Satu pengukuran tahap (durasi, jumlah baris dan byte); dipakai sebagai context manager
+    """
+    __slots__ = ('instrumentation', 'name', 'labels', 'rows', 'bytes', 'start', 'duration', 'error')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str, labels: Dict[str, Any]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.labels = labels
+        self.rows = 0
+        self.bytes = 0
+        self.duration = 0.0
+        self.error = False
+
+    def record(self, rows: int = 0, nbytes: int = 0, **labels: Any):
+        self.rows += rows
+        self.bytes += nbytes
+        self.labels.update(labels)
+
+    def record_frame(self, data: Optional[pd.DataFrame], **labels: Any):
+        """
+        Catat jumlah baris dan perkiraan byte sebuah DataFrame
+        """
+        if data is not None:
+            self.record(len(data), frame_bytes(data), **labels)
+        else:
+            self.labels.update(labels)
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        self.error = exc_type is not None
+        self.instrumentation.finish(self)
+        return False
+
+class _NullSpan:
+    """
+    Span kosong saat instrumentasi nonaktif: tanpa pencatatan waktu maupun alokasi
+    """
+    __slots__ = ()
+
+    def record(self, rows: int = 0, nbytes: int = 0, **labels: Any):
+        pass
+
+    def record_frame(self, data: Optional[pd.DataFrame], **labels: Any):
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Instrumentation:
+    STAGE_FIELDS = ['calls', 'seconds', 'max_seconds', 'rows', 'bytes', 'errors']
+
+    def __init__(self, enabled: bool = True, jsonl_path: Optional[str] = None,
+                 prometheus_path: Optional[str] = None, recent: int = 200):
+        """
+        Catat durasi, jumlah baris/byte dan error per tahap (query, cache, grafik, tabel).
+        Agregat disimpan di memori; span bisa ditulis ke file JSON lines dan agregat ke
+        file teks Prometheus (textfile collector)
+        """
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._cache: Dict[Tuple[str, str], int] = {}
+        self._recent: deque = deque(maxlen=recent)
+        self._pending: List[str] = []
+
+    def span(self, name: str, **labels: Any):
+        """
+        Context manager pengukuran satu tahap; nilai yang sama selalu dikembalikan saat nonaktif
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, labels)
+
+    def finish(self, span: Span):
+        with self._lock:
+            stage = self._stages.get(span.name)
+            if stage is None:
+                stage = self._stages[span.name] = dict.fromkeys(self.STAGE_FIELDS, 0)
+            stage['calls'] += 1
+            stage['seconds'] += span.duration
+            stage['max_seconds'] = max(stage['max_seconds'], span.duration)
+            stage['rows'] += span.rows
+            stage['bytes'] += span.bytes
+            stage['errors'] += span.error
+            event = {
+                'ts': time.time(), 'stage': span.name, 'seconds': round(span.duration, 6),
+                'rows': span.rows, 'bytes': span.bytes, 'error': span.error,
+                'thread': threading.current_thread().name, **span.labels
+            }
+            self._recent.append(event)
+            if self.jsonl_path:
+                self._pending.append(json.dumps(event, default=str))
+
+    def cache_lookup(self, cache: str, hit: bool):
+        """
+        Catat hit/miss untuk satu cache (misalnya 'session' atau 'figure')
+        """
+        if not self.enabled:
+            return
+        key = (cache, 'hit' if hit else 'miss')
+        with self._lock:
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def stages(self) -> pd.DataFrame:
+        """
+        Agregat per tahap, diurutkan dari total durasi terbesar
+        """
+        with self._lock:
+            rows = [{'tahap': name, **stage} for name, stage in self._stages.items()]
+        data = pd.DataFrame(rows, columns=['tahap'] + self.STAGE_FIELDS)
+        data['avg_ms'] = (data['seconds'] / data['calls'].where(data['calls'] > 0) * 1000).round(2)
+        return data.sort_values('seconds', ascending=False, ignore_index=True)
+
+    def cache_counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            counts: Dict[str, Dict[str, int]] = {}
+            for (cache, outcome), value in self._cache.items():
+                counts.setdefault(cache, {'hit': 0, 'miss': 0})[outcome] = value
+            return counts
+
+    def recent(self, limit: int = 30) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)[-limit:]
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._cache.clear()
+            self._recent.clear()
+
+    def flush(self, gauges: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Tulis span yang tertunda ke file JSON lines dan agregat ke file Prometheus.
+        `gauges` berisi statistik tambahan, misalnya {'pool': pool.stats()}
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(pending) + '\n')
+        if self.prometheus_path:
+            text = self.prometheus_text(gauges)
+            # File sementara per thread: sesi lain bisa menulis file yang sama bersamaan
+            tmp_path = f'{self.prometheus_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self.prometheus_path)
+
+    def prometheus_text(self, gauges: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """
+        Agregat dalam format teks eksposisi Prometheus
+        """
+        metrics = [
+            ('sla_stage_calls_total', 'counter', 'calls'),
+            ('sla_stage_seconds_total', 'counter', 'seconds'),
+            ('sla_stage_max_seconds', 'gauge', 'max_seconds'),
+            ('sla_stage_rows_total', 'counter', 'rows'),
+            ('sla_stage_bytes_total', 'counter', 'bytes'),
+            ('sla_stage_errors_total', 'counter', 'errors'),
+        ]
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self._stages.items()}
+            cache = dict(self._cache)
+        lines = []
+        for metric, kind, field in metrics:
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.extend(f'{metric}{{stage="{name}"}} {stage[field]:g}' for name, stage in sorted(stages.items()))
+        lines.append('# TYPE sla_cache_lookups_total counter')
+        lines.extend(f'sla_cache_lookups_total{{cache="{name}",result="{outcome}"}} {value}'
+                     for (name, outcome), value in sorted(cache.items()))
+        for group, values in (gauges or {}).items():
+            for field, value in sorted(values.items()):
+                if isinstance(value, (int, float)):
+                    lines.append(f'sla_{group}_{field} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+def frame_bytes(data: Optional[pd.DataFrame]) -> int:
+    """
+    Perkiraan ukuran DataFrame (tanpa menghitung isi objek string satu per satu)
+    """
+    return int(data.memory_usage(index=False, deep=False).sum()) if data is not None else 0
+
+def to_arrow_array(values: Tuple[Any, ...]) -> pa.Array:
+    """
+    Satu kolom hasil fetchmany menjadi array Arrow. Decimal dijadikan float (seperti
+    coerce_float pada read_sql_query); kolom bertipe campuran disimpan sebagai teks
+    """
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array([None if value is None else str(value) for value in values], pa.string())
+    if pa.types.is_decimal(array.type):
+        array = array.cast(pa.float64())
+    return array
+
+def arrow_to_frame(tables: List[pa.Table], schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Gabungkan batch Arrow menjadi satu DataFrame. Kolom kategori pada `schema` di-encode
+    sebagai dictionary di Arrow sehingga langsung menjadi Categorical tanpa objek string per baris.
+    List `tables` dikosongkan agar memori batch bisa dilepas selama konversi
+    """
+    table = pa.concat_tables(tables, promote_options='permissive')
+    del tables[:]
+    if schema:
+        for index, field in enumerate(table.schema):
+            if schema.get(field.name) == 'category' and (pa.types.is_string(field.type)
+                                                         or pa.types.is_large_string(field.type)):
+                table = table.set_column(index, field.name, table.column(index).dictionary_encode())
+    data = table.to_pandas(self_destruct=True, split_blocks=True)
+    del table
+    return apply_schema(data, schema) if schema else data
+
+class QueryBackend:
+    """
+    Antarmuka backend query. Backend membuat koneksi DB-API untuk pool dan membaca
+    hasil query menjadi DataFrame; query SLA yang sama dijalankan di semua backend
+    """
+    name = 'base'
+
+    def connect(self) -> Any:
+        raise NotImplementedError
+
+    def cache_key(self) -> str:
+        """
+        Identitas backend untuk pool koneksi bersama
+        """
+        raise NotImplementedError
+
+    def error_types(self) -> Tuple[type, ...]:
+        """
+        Tipe error database yang ditangani sebagai error koneksi/query
+        """
+        return ()
+
+    def reset(self, conn: Any):
+        """
+        Bersihkan koneksi sebelum dikembalikan ke pool
+        """
+        conn.rollback()
+
+    def execute(self, cursor: Any, query: str, params: Sequence[Any] = ()) -> Any:
+        """
+        Jalankan query dengan parameter terikat (placeholder ?) pada cursor statement dari pool
+        """
+        return cursor.execute(query, tuple(params)) if params else cursor.execute(query)
+
+    def read_frame(self, cursor: Any, query: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        self.execute(cursor, query, params)
+        names = [column[0] for column in cursor.description]
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=names, coerce_float=True)
+
+    def iter_batches(self, cursor: Any, query: str, batch_size: int,
+                     params: Sequence[Any] = ()) -> Iterator[pa.RecordBatch]:
+        """
+        Jalankan query dan hasilkan record batch Arrow per `batch_size` baris lewat
+        cursor.fetchmany, sehingga hanya satu batch tuple baris yang ada di memori
+        """
+        cursor.arraysize = batch_size
+        self.execute(cursor, query, params)
+        names = [column[0] for column in cursor.description]
+        empty = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            empty = False
+            columns = list(zip(*rows))
+            del rows
+            yield pa.RecordBatch.from_arrays([to_arrow_array(values) for values in columns], names=names)
+        if empty:
+            yield pa.RecordBatch.from_arrays([pa.array([], pa.null()) for _ in names], names=names)
+
+class PyODBCBackend(QueryBackend):
+    name = 'mssql'
+
+    def __init__(self, server: str, database: str, username: str, password: str, driver: str):
+        """
+        Backend SQL Server melalui pyodbc
+        """
+        self.connection_string = (
+            f'DRIVER={{{driver}}};'
+            f'SERVER={server};'
+            f'DATABASE={database};'
+            f'UID={username};'
+            f'PWD={password};'
+            'TrustServerCertificate=yes'
+        )
+
+    def connect(self) -> Any:
+        if pyodbc is None:
+            raise RuntimeError("pyodbc tidak terpasang; gunakan SLA_BACKEND=sqlite atau duckdb untuk data lokal")
+        return pyodbc.connect(self.connection_string)
+
+    def cache_key(self) -> str:
+        return f'mssql:{self.connection_string}'
+
+    def error_types(self) -> Tuple[type, ...]:
+        return (pyodbc.Error,) if pyodbc is not None else ()
+
+class SQLiteBackend(QueryBackend):
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        """
+        Backend lokal SQLite; berisi tabel SLA_HMS hasil ekstraksi atau data sintetis
+        """
+        self.path = path
+
+    def connect(self) -> Any:
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def cache_key(self) -> str:
+        return f'sqlite:{os.path.abspath(self.path)}'
+
+    def error_types(self) -> Tuple[type, ...]:
+        return (sqlite3.Error,)
+
+class DuckDBBackend(QueryBackend):
+    name = 'duckdb'
+
+    def __init__(self, path: str, read_only: bool = True):
+        """
+        Backend lokal DuckDB (mesin analitik kolumnar); paket duckdb bersifat opsional
+        """
+        self.path = path
+        self.read_only = read_only
+
+    def connect(self) -> Any:
+        import duckdb
+        return duckdb.connect(self.path, read_only=self.read_only)
+
+    def cache_key(self) -> str:
+        return f'duckdb:{os.path.abspath(self.path)}:{self.read_only}'
+
+    def error_types(self) -> Tuple[type, ...]:
+        try:
+            import duckdb
+        except ImportError:
+            return ()
+        return (duckdb.Error,)
+
+    def reset(self, conn: Any):
+        import duckdb
+        try:
+            conn.rollback()
+        except duckdb.TransactionException:
+            # DuckDB menolak rollback tanpa transaksi aktif; koneksi tetap layak dipakai ulang
+            pass
+
+    def read_frame(self, cursor: Any, query: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        # Hasil DuckDB langsung dikonversi secara kolumnar, tanpa melalui tuple per baris
+        return self.execute(cursor, query, params).df()
+
+    def iter_batches(self, cursor: Any, query: str, batch_size: int,
+                     params: Sequence[Any] = ()) -> Iterator[pa.RecordBatch]:
+        # DuckDB menghasilkan record batch Arrow langsung, tanpa tuple baris
+        yield from self.execute(cursor, query, params).fetch_record_batch(batch_size)
+
+def create_backend(kind: Optional[str] = None, **config: Any) -> QueryBackend:
+    """
+    Pilih backend dari parameter atau variabel lingkungan SLA_BACKEND
+    (mssql | sqlite | duckdb). Backend lokal memakai SLA_DB_PATH
+    """
+    kind = (kind or os.environ.get('SLA_BACKEND', 'mssql')).lower()
+    if kind == 'mssql':
+        return PyODBCBackend(**config)
+    path = os.environ.get('SLA_DB_PATH', 'sla_hms.db' if kind == 'sqlite' else 'sla_hms.duckdb')
+    if kind == 'sqlite':
+        return SQLiteBackend(path)
+    if kind == 'duckdb':
+        return DuckDBBackend(path)
+    raise ValueError(f"Backend tidak dikenal: {kind}")
+
+def create_connection_pool(backend: QueryBackend, max_size: int = 10,
+                           instrumentation: Optional[Instrumentation] = None) -> ConnectionPool:
+    """
+    Pool koneksi untuk backend; pembuatan koneksi dicatat sebagai span db.connect
+    """
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+
+    def connect() -> Any:
+        with instrumentation.span('db.connect', backend=backend.name):
+            return backend.connect()
+    return ConnectionPool(connect, max_size=max_size, reset=backend.reset)
+
+def set_query_timeout(conn: Any, timeout: float):
+    """
+    Atur batas waktu query pada koneksi pyodbc (0 = tanpa batas).
+    Driver yang tidak mendukungnya diabaikan
+    """
+    try:
+        conn.timeout = int(math.ceil(timeout))
+    except AttributeError:
+        pass
+
+class QueryExecutor:
+    def __init__(self, max_workers: int = 4):
+        """
+        Menjalankan beberapa query independen secara bersamaan di thread pool terbatas
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sla-query')
+
+    def run_all(self, tasks: Dict[str, Callable[[], Any]],
+                timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Jalankan semua task dan kumpulkan hasil serta error per key.
+        Task yang belum selesai saat batas waktu habis dibatalkan
+        """
+        futures = {key: self._executor.submit(task) for key, task in tasks.items()}
+        _, not_done = wait(futures.values(), timeout=timeout)
+        results = {}
+        errors = {}
+        for key, future in futures.items():
+            if future in not_done:
+                # Task yang belum mulai dibatalkan; query yang sedang jalan dihentikan oleh driver
+                future.cancel()
+                errors[key] = f"melebihi batas waktu {timeout} detik"
+            elif future.exception() is not None:
+                errors[key] = str(future.exception())
+            else:
+                results[key] = future.result()
+        return results, errors
+
+class DatabaseConnection:
+    def __init__(self, backend: QueryBackend, pool_size: int = 10,
+                 instrumentation: Optional[Instrumentation] = None, batch_size: Optional[int] = None,
+                 pool: Optional[ConnectionPool] = None, on_error: Optional[Callable[[str], Any]] = None):
+        """
+        Inisialisasi koneksi database melalui backend yang dipilih.
+        Dengan `batch_size`, hasil query dibaca bertahap per batch (lihat stream_batches).
+        `pool` dipakai bersama jika diberikan (satu pool per proses); `on_error` menerima
+        pesan error koneksi dari fetch_data, misalnya st.error
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.pool = pool or create_connection_pool(backend, pool_size, self.instrumentation)
+        self.on_error = on_error
+    
+    def stream_batches(self, query: str, batch_size: Optional[int] = None,
+                       timeout: Optional[float] = None, params: Sequence[Any] = ()) -> Iterator[pa.RecordBatch]:
+        """
+        Hasilkan record batch Arrow secara bertahap, untuk konsumen (agregasi, ekspor) yang
+        tidak perlu memuat seluruh tabel. Koneksi dipinjam selama iterasi berlangsung
+        """
+        batch_size = batch_size or self.batch_size or 50_000
+        with self.instrumentation.span('db.stream', backend=self.backend.name) as span:
+            with self.pool.connection() as conn:
+                if timeout:
+                    set_query_timeout(conn, timeout)
+                try:
+                    cursor = self.pool.statement_cursor(conn, query)
+                    for batch in self.backend.iter_batches(cursor, query, batch_size, params):
+                        span.record(batch.num_rows, batch.nbytes)
+                        yield batch
+                finally:
+                    if timeout:
+                        set_query_timeout(conn, 0)
+
+    def query_data(self, query: str, timeout: Optional[float] = None,
+                   schema: Optional[Dict[str, str]] = None,
+                   progress: Optional[Callable[[int], None]] = None,
+                   params: Sequence[Any] = ()) -> pd.DataFrame:
+        """
+        Jalankan query dan kembalikan DataFrame; error diteruskan ke pemanggil.
+        `timeout` (detik) diteruskan ke driver sebagai batas waktu query, dan
+        `schema` (lihat DETAIL_SCHEMA) diterapkan langsung pada hasilnya.
+        `progress` dipanggil dengan jumlah baris yang sudah dibaca (mode batch).
+        `params` adalah nilai untuk placeholder ? di query
+        """
+        if self.batch_size:
+            return self.query_data_batched(query, timeout, schema, progress, params)
+        # db.query mencakup menunggu/membuat koneksi; db.read_frame hanya eksekusi dan transfer hasil
+        with self.instrumentation.span('db.query', backend=self.backend.name):
+            with self.pool.connection() as conn:
+                if timeout:
+                    set_query_timeout(conn, timeout)
+                try:
+                    with self.instrumentation.span('db.read_frame') as span:
+                        data = self.backend.read_frame(self.pool.statement_cursor(conn, query), query, params)
+                        span.record_frame(data)
+                finally:
+                    if timeout:
+                        set_query_timeout(conn, 0)
+            if schema:
+                with self.instrumentation.span('db.apply_schema') as span:
+                    data = apply_schema(data, schema)
+                    span.record_frame(data)
+        return data
+
+    def query_data_batched(self, query: str, timeout: Optional[float] = None,
+                           schema: Optional[Dict[str, str]] = None,
+                           progress: Optional[Callable[[int], None]] = None,
+                           params: Sequence[Any] = ()) -> pd.DataFrame:
+        """
+        Seperti query_data, tetapi hasil dikumpulkan per record batch Arrow yang ringkas
+        dan baru dikonversi ke DataFrame di akhir, tanpa menampung semua tuple baris
+        """
+        tables = []
+        rows = 0
+        for batch in self.stream_batches(query, timeout=timeout, params=params):
+            tables.append(pa.Table.from_batches([batch]))
+            rows += batch.num_rows
+            if progress is not None:
+                progress(rows)
+        with self.instrumentation.span('db.arrow_to_frame') as span:
+            data = arrow_to_frame(tables, schema)
+            span.record_frame(data)
+        return data
+    
+    def fetch_data(self, query: str, schema: Optional[Dict[str, str]] = None,
+                   params: Sequence[Any] = ()) -> Optional[pd.DataFrame]:
+        """
+        Ambil data dari database menggunakan query (dan parameter) yang diberikan
+        """
+        with self.instrumentation.span('fetch_data') as span:
+            try:
+                data = self.query_data(query, schema=schema, params=params)
+            except self.backend.error_types() + (pd.errors.DatabaseError, PoolTimeoutError) as e:
+                span.record(error_type=type(e).__name__)
+                if self.on_error is not None:
+                    self.on_error(f"Error koneksi: {e}")
+                return None
+            span.record_frame(data)
+            return data
+
+# Kolom yang diambil untuk tabel detail (juga sumber semua perhitungan SLA)
+DETAIL_COLUMNS = [
+    'Nomor_Customer', 'Nama_Customer', 'Nama_Cabang', 'Nomor_Equipment', 'Nomor_Polisi',
+    'Kelompok_Model', 'kategori_unit', 'Tipe_Transmisi', 'km_harian', 'Last_KM_Update',
+    'Last_KM_ACCU', 'Last_Tgl_Release_ACCU_SPK', 'Konsumsi_ACCU', 'Indikator_ACCU',
+    'Status_ACCU', 'Tgl_Plan_Pergantian_ACCU', 'Last_KM_Kopling', 'Last_Tgl_Release_Kopling_SPK',
+    'Konsumsi_Kopling', 'Indikator_Kopling', 'Status_Kopling', 'Tgl_Plan_Pergantian_Kopling',
+    'Last_KM_Ban', 'Last_Tgl_Release_Ban_SPK', 'Konsumsi_Ban', 'Indikator_Ban', 'Status_Ban',
+    'Last_KM_PB', 'Tgl_Last_Service_PB', 'Selisih_KM_Service', 'Status_PB',
+    'Next_Plan_KM_Service', 'Tanggal_Plan_Service'
+]
+
+# Tipe kolom data detail: teks berulang -> category, angka -> numerik terkecil, tanggal -> datetime
+DETAIL_SCHEMA = {
+    'Nomor_Customer': 'category',
+    'Nama_Customer': 'category',
+    'Nama_Cabang': 'category',
+    'Kelompok_Model': 'category',
+    'kategori_unit': 'category',
+    'Tipe_Transmisi': 'category',
+    'Indikator_ACCU': 'category',
+    'Status_ACCU': 'category',
+    'Indikator_Kopling': 'category',
+    'Status_Kopling': 'category',
+    'Indikator_Ban': 'category',
+    'Status_Ban': 'category',
+    'Status_PB': 'category',
+    'km_harian': 'numeric',
+    'Last_KM_Update': 'numeric',
+    'Last_KM_ACCU': 'numeric',
+    'Konsumsi_ACCU': 'numeric',
+    'Last_KM_Kopling': 'numeric',
+    'Konsumsi_Kopling': 'numeric',
+    'Last_KM_Ban': 'numeric',
+    'Konsumsi_Ban': 'numeric',
+    'Last_KM_PB': 'numeric',
+    'Selisih_KM_Service': 'numeric',
+    'Next_Plan_KM_Service': 'numeric',
+    'Last_Tgl_Release_ACCU_SPK': 'datetime',
+    'Tgl_Plan_Pergantian_ACCU': 'datetime',
+    'Last_Tgl_Release_Kopling_SPK': 'datetime',
+    'Tgl_Plan_Pergantian_Kopling': 'datetime',
+    'Last_Tgl_Release_Ban_SPK': 'datetime',
+    'Tgl_Last_Service_PB': 'datetime',
+    'Tanggal_Plan_Service': 'datetime',
+}
+
+def apply_schema(data: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Terapkan tipe kolom yang ringkas. Konversi numerik/tanggal hanya dipakai jika
+    tidak ada nilai yang hilang karena gagal dikonversi; jika ada, kolom dibiarkan apa adanya
+    """
+    converted = {}
+    for column in data.columns:
+        kind = schema.get(column)
+        values = data[column]
+        if kind is None:
+            continue
+        if kind == 'category':
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                converted[column] = values.astype('category')
+        elif kind == 'numeric':
+            numbers = pd.to_numeric(values, errors='coerce')
+            if numbers.isna().sum() > values.isna().sum():
+                continue
+            if numbers.notna().all() and (numbers % 1 == 0).all():
+                converted[column] = pd.to_numeric(numbers, downcast='integer')
+            else:
+                converted[column] = pd.to_numeric(numbers, downcast='float')
+        elif kind == 'datetime':
+            if pd.api.types.is_datetime64_any_dtype(values):
+                continue
+            dates = pd.to_datetime(values, errors='coerce')
+            if dates.isna().sum() == values.isna().sum():
+                converted[column] = dates
+    return data.assign(**converted) if converted else data
+
+def build_detail_query(extra_columns: List[str] = ()) -> str:
+    """
+    Query detail dengan kolom tambahan opsional; {branch_filter} diganti saat query dijalankan
+    """
+    columns = DETAIL_COLUMNS + list(extra_columns)
+    return f"""
+    SELECT
+    {', '.join(columns)}
+    FROM SLA_HMS
+    WHERE 1=1 {{branch_filter}}
+"""
+
+QUERY_DETAIL = build_detail_query()
+
+def branch_filter(branches: Tuple[str, ...]) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Filter cabang berparameter untuk {branch_filter}: (klausa SQL, nilai parameter)
+    """
+    if not branches:
+        return "", ()
+    return f"AND Nama_Cabang IN ({', '.join('?' * len(branches))})", tuple(branches)
+
+# Komponen SLA: kolom status dan apakah unit A/T dikecualikan (khusus Kopling)
+SLA_COMPONENTS = {
+    'accu': {'status_column': 'Status_ACCU', 'exclude_at': False},
+    'kopling': {'status_column': 'Status_Kopling', 'exclude_at': True},
+    'pb': {'status_column': 'Status_PB', 'exclude_at': False},
+    'ban': {'status_column': 'Status_Ban', 'exclude_at': False},
+}
+
+def find_column(data: pd.DataFrame, column: str) -> Optional[str]:
+    """
+    Cari nama kolom di DataFrame tanpa memperhatikan kapitalisasi
+    """
+    for col in data.columns:
+        if col.lower() == column.lower():
+            return col
+    return None
+
+def normalize_branch_selection(selected_cabang: Optional[List[str]]) -> Tuple[str, ...]:
+    """
+    Normalisasi pilihan cabang menjadi tuple terurut tanpa duplikat;
+    tuple kosong berarti semua cabang ("All" atau tidak ada pilihan)
+    """
+    if not selected_cabang or "All" in selected_cabang:
+        return ()
+    return tuple(sorted(set(selected_cabang)))
+
+class SLAAggregator:
+    def __init__(self, components: Dict[str, Dict[str, Any]] = SLA_COMPONENTS):
+        """
+        Aturan agregasi SLA per komponen (baris yang dihitung dan status OK), setara dengan
+        query SQL aslinya; dipakai SLACountCube untuk menghitung gauge dan breakdown cabang
+        """
+        self.components = components
+
+    @staticmethod
+    def normalize_text(series: pd.Series) -> pd.Series:
+        """
+        Samakan perbandingan teks dengan SQL Server (collation CI, spasi di akhir diabaikan)
+        """
+        return series.astype('string').str.rstrip().str.upper()
+
+    def eligible_mask(self, data: pd.DataFrame, key: str) -> pd.Series:
+        """
+        Baris yang dihitung untuk komponen; setara dengan WHERE tipe_transmisi <> 'A/T'
+        untuk Kopling (NULL ikut dikecualikan seperti di SQL)
+        """
+        if not self.components[key]['exclude_at']:
+            return pd.Series(True, index=data.index)
+        transmisi_column = find_column(data, 'Tipe_Transmisi')
+        if transmisi_column is None:
+            return pd.Series(True, index=data.index)
+        transmisi = self.normalize_text(data[transmisi_column])
+        return (transmisi != 'A/T').fillna(False).astype(bool)
+
+    def ok_mask(self, data: pd.DataFrame, key: str) -> pd.Series:
+        """
+        Baris dengan status OK; status NULL dihitung sebagai bukan OK
+        """
+        status_column = find_column(data, self.components[key]['status_column'])
+        if status_column is None:
+            return pd.Series(False, index=data.index)
+        return (self.normalize_text(data[status_column]) == 'OK').fillna(False).astype(bool)
+
+class SLACountCube:
+    STATUSES = ['OK', 'NOT OK']
+
+    def __init__(self, branches: List[Any], components: Dict[str, Dict[str, Any]],
+                 counts: np.ndarray, row_totals: np.ndarray):
+        """
+        Cube jumlah unit berdimensi Nama_Cabang x komponen x status (OK / NOT OK).
+        Subset cabang apa pun dijawab dengan menjumlahkan irisan cube, tanpa SQL
+        """
+        self.branches = branches
+        self.components = components
+        self.counts = counts
+        self.row_totals = row_totals
+        self._index = {branch: i for i, branch in enumerate(branches)}
+
+    @classmethod
+    def from_frame(cls, data: Optional[pd.DataFrame], aggregator: SLAAggregator) -> 'SLACountCube':
+        """
+        Bangun cube dari DataFrame detail dengan satu kali penelusuran per komponen
+        """
+        components = aggregator.components
+        branch_column = find_column(data, 'Nama_Cabang') if data is not None else None
+        if data is None or data.empty or branch_column is None:
+            return cls([], components, np.zeros((0, len(components), 2), dtype=np.int64),
+                       np.zeros(0, dtype=np.int64))
+
+        # NULL Nama_Cabang tetap menjadi satu kelompok, seperti GROUP BY di SQL
+        codes, uniques = pd.factorize(data[branch_column], use_na_sentinel=False)
+        uniques = [None if pd.isna(branch) else branch for branch in uniques]
+        size = len(uniques)
+        counts = np.zeros((size, len(components), 2), dtype=np.int64)
+        for c, key in enumerate(components):
+            eligible = aggregator.eligible_mask(data, key).to_numpy()
+            ok = aggregator.ok_mask(data, key).to_numpy()
+            counts[:, c, 0] = np.bincount(codes[eligible & ok], minlength=size)
+            counts[:, c, 1] = np.bincount(codes[eligible & ~ok], minlength=size)
+        row_totals = np.bincount(codes, minlength=size).astype(np.int64)
+        return cls(uniques, components, counts, row_totals)
+
+    def merge(self, other: 'SLACountCube', sign: int = 1) -> 'SLACountCube':
+        """
+        Cube baru hasil penjumlahan (sign=1) atau pengurangan (sign=-1) cube lain.
+        Dipakai untuk menerapkan delta refresh tanpa membangun ulang dari semua baris
+        """
+        branches = list(self.branches) + [b for b in other.branches if b not in self._index]
+        counts = np.zeros((len(branches),) + self.counts.shape[1:], dtype=np.int64)
+        row_totals = np.zeros(len(branches), dtype=np.int64)
+        counts[:len(self.branches)] = self.counts
+        row_totals[:len(self.branches)] = self.row_totals
+        index = {branch: i for i, branch in enumerate(branches)}
+        positions = np.array([index[b] for b in other.branches], dtype=np.int64)
+        np.add.at(counts, positions, sign * other.counts)
+        np.add.at(row_totals, positions, sign * other.row_totals)
+        return SLACountCube(branches, self.components, counts, row_totals)
+
+    def branch_names(self) -> List[str]:
+        """
+        Daftar cabang terurut untuk filter (tanpa NULL)
+        """
+        return sorted(
+            branch for branch, total in zip(self.branches, self.row_totals)
+            if isinstance(branch, str) and total > 0
+        )
+
+    def _select(self, branches: Tuple[str, ...] = ()) -> np.ndarray:
+        """
+        Indeks cabang terpilih; tuple kosong berarti semua cabang
+        """
+        if not branches:
+            return np.arange(len(self.branches))
+        return np.array([self._index[b] for b in branches if b in self._index], dtype=np.int64)
+
+    def query(self, branches: Tuple[str, ...] = ()) -> Tuple[Dict[str, float], Dict[str, pd.DataFrame]]:
+        """
+        Persentase SLA keseluruhan (0-100) dan persentase per cabang x status untuk subset cabang
+        """
+        selected = self._select(branches)
+        names = np.asarray(self.branches, dtype=object)[selected]
+        percentages = {}
+        branch_results = {}
+        for c, (key, config) in enumerate(self.components.items()):
+            ok = self.counts[selected, c, 0]
+            not_ok = self.counts[selected, c, 1]
+            total = ok + not_ok
+
+            ok_sum, total_sum = int(ok.sum()), int(total.sum())
+            percentages[key] = round(ok_sum / total_sum, 3) * 100 if total_sum and ok_sum else 0
+
+            # Hanya kelompok yang punya baris, seperti hasil GROUP BY
+            jumlah = np.concatenate([ok, not_ok])
+            keep = jumlah > 0
+            totals = np.concatenate([total, total])[keep]
+            branch_results[key] = pd.DataFrame({
+                'Nama_Cabang': np.concatenate([names, names])[keep],
+                config['status_column']: np.repeat(self.STATUSES, len(names))[keep],
+                'persentase': np.round(jumlah[keep] * 100.0 / totals, 2),
+            })
+        return percentages, branch_results
+
+def sql_param(value: Any) -> Any:
+    """
+    Ubah nilai watermark menjadi tipe Python biasa yang bisa diikat driver sebagai parameter
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+class WatermarkStrategy:
+    """
+    Strategi watermark untuk refresh inkremental. Subclass menentukan kolom tambahan
+    di query detail, cara membaca watermark dari data, dan cara mengambil baris yang berubah
+    """
+    key_column = 'Nomor_Equipment'
+    extra_columns: List[str] = []
+    meta_columns: List[str] = []
+
+    def watermark(self, data: pd.DataFrame) -> Any:
+        raise NotImplementedError
+
+    def fetch_delta(self, db_connection: 'DatabaseConnection', watermark: Any) -> Optional[Tuple[pd.DataFrame, List[Any]]]:
+        """
+        Ambil (baris yang berubah, key yang dihapus); None berarti perlu muat ulang penuh
+        """
+        raise NotImplementedError
+
+class ColumnWatermark(WatermarkStrategy):
+    def __init__(self, column: str, expression: Optional[str] = None):
+        """
+        Watermark dari nilai maksimum kolom waktu modifikasi baris. Kolom harus ikut berubah
+        setiap kali baris diubah; kolom data seperti Last_KM_Update (odometer) tidak memenuhi itu.
+        `expression` dipakai jika kolom perlu dikonversi, misalnya rowversion ke BIGINT.
+        Baris yang dihapus tidak terdeteksi; gunakan muat ulang penuh untuk itu
+        """
+        self.column = column
+        self.expression = expression or column
+        if column not in DETAIL_COLUMNS:
+            self.extra_columns = [f"{self.expression} AS {column}"]
+            self.meta_columns = [column]
+
+    def watermark(self, data: pd.DataFrame) -> Any:
+        column = find_column(data, self.column)
+        if column is None or data[column].dropna().empty:
+            return None
+        return data[column].max()
+
+    def fetch_delta(self, db_connection: 'DatabaseConnection', watermark: Any) -> Optional[Tuple[pd.DataFrame, List[Any]]]:
+        if watermark is None:
+            return None
+        # >= agar baris dengan nilai watermark yang sama tidak terlewat; duplikat dibuang saat merge
+        query = build_detail_query(self.extra_columns).replace(
+            '{branch_filter}', f"AND {self.expression} >= ?"
+        )
+        rows = db_connection.fetch_data(query, schema=DETAIL_SCHEMA, params=(sql_param(watermark),))
+        if rows is None:
+            return None
+        return rows, []
+
+class RowVersionWatermark(ColumnWatermark):
+    def __init__(self, column: str = 'RowVer'):
+        """
+        Watermark dari kolom rowversion SQL Server (dibandingkan sebagai BIGINT)
+        """
+        super().__init__('SLA_RowVersion', f"CAST({column} AS BIGINT)")
+
+class ChangeTrackingWatermark(WatermarkStrategy):
+    extra_columns = ["CHANGE_TRACKING_CURRENT_VERSION() AS SLA_CT_Version"]
+    meta_columns = ['SLA_CT_Version']
+
+    def __init__(self, table: str = 'SLA_HMS'):
+        """
+        Watermark dari SQL Server Change Tracking; juga mendeteksi baris yang dihapus.
+        Membutuhkan CHANGE_TRACKING aktif pada tabel sumber
+        """
+        self.table = table
+
+    def watermark(self, data: pd.DataFrame) -> Any:
+        if 'SLA_CT_Version' not in data.columns or data['SLA_CT_Version'].dropna().empty:
+            return None
+        return int(data['SLA_CT_Version'].max())
+
+    def fetch_delta(self, db_connection: 'DatabaseConnection', watermark: Any) -> Optional[Tuple[pd.DataFrame, List[Any]]]:
+        if watermark is None:
+            return None
+        # Versi yang sudah dibersihkan oleh retensi tidak bisa dipakai: muat ulang penuh
+        check = db_connection.fetch_data(
+            "SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(?)) AS min_version", params=(self.table,)
+        )
+        if check is None or check.empty or check['min_version'].iloc[0] is None \
+                or int(check['min_version'].iloc[0]) > watermark:
+            return None
+
+        columns = ', '.join(f"S.{column}" for column in DETAIL_COLUMNS)
+        query = f"""
+            SELECT
+            CT.SYS_CHANGE_OPERATION AS SLA_Change_Operation,
+            CT.{self.key_column} AS SLA_Change_Key,
+            CHANGE_TRACKING_CURRENT_VERSION() AS SLA_CT_Version,
+            {columns}
+            FROM CHANGETABLE(CHANGES {self.table}, ?) AS CT
+            LEFT JOIN {self.table} AS S ON S.{self.key_column} = CT.{self.key_column}
+        """
+        changes = db_connection.fetch_data(query, schema=DETAIL_SCHEMA, params=(int(watermark),))
+        if changes is None:
+            return None
+        deleted = changes['SLA_Change_Operation'] == 'D'
+        deleted_keys = changes.loc[deleted, 'SLA_Change_Key'].tolist()
+        rows = changes.loc[~deleted].drop(columns=['SLA_Change_Operation', 'SLA_Change_Key'])
+        return rows, deleted_keys
+
+def create_watermark(spec: Optional[str] = None) -> Optional[WatermarkStrategy]:
+    """
+    Strategi refresh inkremental dari parameter atau variabel lingkungan SLA_WATERMARK:
+    column:<kolom waktu modifikasi> | rowversion:<kolom rowversion> | change_tracking[:<tabel>].
+    Kosong berarti tanpa refresh inkremental (Refresh selalu memuat ulang penuh)
+    """
+    spec = (spec if spec is not None else os.environ.get('SLA_WATERMARK', '')).strip()
+    if not spec:
+        return None
+    kind, _, argument = spec.partition(':')
+    kind = kind.strip().lower()
+    argument = argument.strip()
+    if kind == 'column' and argument:
+        return ColumnWatermark(argument)
+    if kind == 'rowversion':
+        return RowVersionWatermark(argument or 'RowVer')
+    if kind == 'change_tracking':
+        return ChangeTrackingWatermark(argument or 'SLA_HMS')
+    raise ValueError(f"SLA_WATERMARK tidak dikenal: {spec}")
+
+def values_equal(old: pd.Series, new: pd.Series) -> np.ndarray:
+    """
+    Bandingkan dua kolom per baris; NULL sama dengan NULL. Angka dibandingkan dengan toleransi
+    kecil karena tipe ringkas (float32) bisa berbeda antara data cache dan delta
+    """
+    old_na = old.isna().to_numpy()
+    new_na = new.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(old) and pd.api.types.is_numeric_dtype(new) \
+            and not pd.api.types.is_bool_dtype(old) and not pd.api.types.is_bool_dtype(new):
+        equal = np.isclose(old.to_numpy(dtype='float64', na_value=np.nan),
+                           new.to_numpy(dtype='float64', na_value=np.nan), rtol=1e-6, atol=0)
+    elif pd.api.types.is_datetime64_any_dtype(old) and pd.api.types.is_datetime64_any_dtype(new):
+        equal = old.to_numpy(dtype='datetime64[ns]') == new.to_numpy(dtype='datetime64[ns]')
+    else:
+        equal = old.astype('string').fillna('').to_numpy() == new.astype('string').fillna('').to_numpy()
+    return np.where(old_na | new_na, old_na & new_na, equal)
+
+def drop_unchanged_rows(data_all: pd.DataFrame, rows: pd.DataFrame, key_column: str) -> pd.DataFrame:
+    """
+    Buang baris delta yang isinya sama persis dengan baris di data detail, misalnya baris batas
+    watermark yang selalu terambil ulang karena query memakai >=
+    """
+    rows = rows.reindex(columns=data_all.columns).drop_duplicates(subset=key_column, keep='last')
+    cached = data_all.drop_duplicates(subset=key_column, keep='last').set_index(key_column)
+    present = rows[key_column].isin(cached.index).to_numpy()
+    if not present.any():
+        return rows
+    old = cached.loc[rows.loc[present, key_column]].reset_index()
+    new = rows.loc[present].reset_index(drop=True)
+    same = np.ones(len(new), dtype=bool)
+    for column in data_all.columns:
+        same &= values_equal(old[column], new[column])
+    unchanged = np.zeros(len(rows), dtype=bool)
+    unchanged[present] = same
+    return rows.loc[~unchanged]
+
+def merge_delta(data_all: pd.DataFrame, rows: pd.DataFrame, deleted_keys: List[Any],
+                key_column: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Gabungkan baris delta ke data detail berdasarkan key.
+    Mengembalikan (data hasil gabungan, baris lama yang diganti/dihapus, baris baru)
+    """
+    rows = rows.reindex(columns=data_all.columns).drop_duplicates(subset=key_column, keep='last')
+    changed = pd.Index(rows[key_column]).append(pd.Index(deleted_keys))
+    replaced = data_all[key_column].isin(changed)
+    removed = data_all[replaced]
+    merged = pd.concat([data_all[~replaced], rows], ignore_index=True)
+    # Kategori yang berbeda antara data lama dan delta membuat concat jatuh ke object
+    return apply_schema(merged, DETAIL_SCHEMA), removed, rows
+
+def arrow_string_types(arrow_type: pa.DataType) -> Optional[pd.ArrowDtype]:
+    """
+    types_mapper untuk to_pandas: kolom teks dibiarkan sebagai ArrowDtype
+    """
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+class SnapshotStore:
+    def __init__(self, directory: str, max_age: float = 600.0, name: str = 'sla_hms'):
+        """
+        Snapshot lokal tabel SLA_HMS dalam format Arrow IPC yang dibaca secara memory-mapped.
+        Semua sesi dan proses membaca file yang sama, sehingga database hanya diakses
+        sekali per `max_age` detik. File baru ditulis dengan nama berversi lalu pointer
+        `current.json` diganti secara atomik
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.name = name
+        self.pointer_path = os.path.join(directory, f'{name}.current.json')
+        self.lock_path = os.path.join(directory, f'{name}.extract.lock')
+        # Baca-ubah-tulis pointer dalam satu proses tidak boleh saling menimpa
+        self._pointer_lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """
+        Info snapshot aktif (file, waktu pembuatan, jumlah baris) atau None
+        """
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(os.path.join(self.directory, info['file'])):
+            return None
+        return info
+
+    def is_fresh(self, info: Optional[Dict[str, Any]]) -> bool:
+        if info is None or info.get('expired'):
+            return False
+        return time.time() - info['created_ts'] <= self.max_age
+
+    def expire(self):
+        """
+        Tandai snapshot aktif kedaluwarsa agar pemuatan berikutnya mengekstrak ulang
+        """
+        with self._pointer_lock:
+            info = self.current()
+            if info is not None:
+                self._write_pointer({**info, 'expired': True})
+
+    def _write_pointer(self, info: Dict[str, Any]):
+        # File sementara per thread: sesi lain bisa menulis pointer bersamaan
+        tmp_path = f'{self.pointer_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with self._pointer_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.pointer_path)
+
+    @staticmethod
+    def _to_table(data: pd.DataFrame) -> pa.Table:
+        try:
+            return pa.Table.from_pandas(data, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Kolom object dengan tipe campuran disimpan sebagai teks
+            converted = data.copy()
+            for column in converted.columns[converted.dtypes == object]:
+                converted[column] = converted[column].map(lambda x: None if x is None else str(x))
+            return pa.Table.from_pandas(converted, preserve_index=False)
+
+    def write(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Tulis snapshot baru: baris diurutkan per Nama_Cabang dan tiap cabang disimpan
+        sebagai record batch sendiri, sehingga filter cabang cukup membaca batch-nya saja
+        """
+        branch_column = find_column(data, 'Nama_Cabang')
+        branch_batches: List[Any] = []
+        if branch_column is not None:
+            data = data.sort_values(branch_column, na_position='last', kind='stable').reset_index(drop=True)
+        table = self._to_table(data)
+
+        created = datetime.now()
+        file_name = f"{self.name}_{created.strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}.arrow"
+        tmp_path = os.path.join(self.directory, file_name + '.tmp')
+        batch_index = 0
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            if branch_column is not None:
+                codes, uniques = pd.factorize(data[branch_column], use_na_sentinel=False)
+                bounds = np.flatnonzero(np.diff(codes)) + 1
+                starts = np.concatenate([[0], bounds]) if len(data) else np.array([], dtype=np.int64)
+                ends = np.concatenate([bounds, [len(data)]]) if len(data) else np.array([], dtype=np.int64)
+                batches = []
+                for start, end in zip(starts, ends):
+                    branch = data[branch_column].iloc[start]
+                    chunk = table.slice(start, end - start).to_batches()
+                    branch_batches.append([None if pd.isna(branch) else str(branch),
+                                           list(range(batch_index, batch_index + len(chunk)))])
+                    batch_index += len(chunk)
+                    batches.extend(chunk)
+            else:
+                batches = table.to_batches()
+            schema = table.schema.with_metadata({'sla_branch_batches': json.dumps(branch_batches)})
+            with pa.ipc.new_file(sink, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+        os.replace(tmp_path, os.path.join(self.directory, file_name))
+
+        info = {
+            'file': file_name,
+            'created_at': created.isoformat(timespec='seconds'),
+            'created_ts': created.timestamp(),
+            'rows': len(data),
+        }
+        self._write_pointer(info)
+        self._cleanup(keep={file_name})
+        return info
+
+    def _cleanup(self, keep: set):
+        """
+        Hapus file snapshot lama; snapshot sebelumnya disimpan karena mungkin masih di-mmap
+        """
+        files = sorted(
+            f for f in os.listdir(self.directory)
+            if f.startswith(self.name + '_') and f.endswith('.arrow') and f not in keep
+        )
+        for file_name in files[:-1]:
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except OSError:
+                pass
+
+    def read(self, info: Dict[str, Any], branches: Tuple[str, ...] = ()) -> pd.DataFrame:
+        """
+        Baca snapshot secara memory-mapped. Hanya kolom teks yang zero-copy; kolom angka,
+        tanggal dan kategori tetap disalin ke NumPy. Jika `branches` diisi, hanya
+        record batch untuk cabang tersebut yang dibaca
+        """
+        source = pa.memory_map(os.path.join(self.directory, info['file']), 'r')
+        reader = pa.ipc.open_file(source)
+        if branches:
+            metadata = reader.schema.metadata or {}
+            branch_batches = json.loads(metadata.get(b'sla_branch_batches', b'[]'))
+            wanted = set(branches)
+            indices = [i for branch, batch_ids in branch_batches if branch in wanted for i in batch_ids]
+            table = pa.Table.from_batches([reader.get_batch(i) for i in indices], schema=reader.schema)
+        else:
+            table = reader.read_all()
+        # Teks tetap berbasis Arrow (zero-copy); dictionary menjadi category dan angka/tanggal
+        # disalin ke NumPy. split_blocks: satu blok per kolom, tanpa salinan tambahan untuk
+        # menggabungkan kolom bertipe sama menjadi blok 2D
+        data = table.to_pandas(types_mapper=arrow_string_types, split_blocks=True)
+        data.attrs['snapshot'] = info
+        return data
+
+    def _acquire_extract_lock(self, stale_after: float = 900.0) -> bool:
+        """
+        Lock antar proses agar hanya satu proses yang mengekstrak dari database
+        """
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.lock_path) > stale_after:
+                    os.remove(self.lock_path)
+            except OSError:
+                pass
+            return False
+
+    def _release_extract_lock(self):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+    def load(self, extract: Callable[[], pd.DataFrame], wait_timeout: float = 300.0) -> pd.DataFrame:
+        """
+        Kembalikan snapshot segar; ekstrak ulang dari database jika sudah kedaluwarsa.
+        Jika ekstraksi gagal dan snapshot lama tersedia, snapshot lama dipakai
+        (ditandai `stale` di data.attrs['snapshot']); jika proses lain sedang mengekstrak,
+        snapshot lama dipakai sementara (ditandai `extracting`)
+        """
+        deadline = time.monotonic() + wait_timeout
+        while True:
+            info = self.current()
+            if self.is_fresh(info):
+                return self.read(info)
+            if self._acquire_extract_lock():
+                break
+            # Proses lain sedang mengekstrak: pakai snapshot lama jika ada, atau tunggu
+            if info is not None:
+                return self.read({**info, 'extracting': True})
+            if time.monotonic() > deadline:
+                raise TimeoutError("Menunggu ekstraksi snapshot dari proses lain terlalu lama")
+            time.sleep(0.5)
+
+        try:
+            info = self.current()
+            if self.is_fresh(info):
+                return self.read(info)
+            try:
+                data = extract()
+            except Exception:
+                if info is None:
+                    raise
+                return self.read({**info, 'stale': True})
+            return self.read(self.write(data))
+        finally:
+            self._release_extract_lock()
+
+class _Flight:
+    """Satu pengambilan data yang sedang berjalan (single-flight)"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class SharedResultCache:
+    def __init__(self, ttl: float = 600.0, max_entries: int = 64, max_bytes: int = 1024 ** 3,
+                 pinned: Sequence[Any] = ()):
+        """
+        Cache hasil query bersama untuk semua sesi di proses server ini.
+        Entri kedaluwarsa setelah `ttl` detik; sesi yang meminta key yang sama
+        secara bersamaan hanya memicu satu kali pengambilan data.
+        Jumlah entri dan total byte dibatasi (LRU) dan entri kedaluwarsa dibuang setiap kali
+        entri baru disimpan. Key di `pinned` (data dasar semua cabang) tidak ikut dibuang,
+        karena tetap dilayani sebagai hasil terakhir selama pembaruan berjalan
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.pinned = set(pinned)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # key -> (waktu simpan, nilai)
+        self._sizes: Dict[Any, int] = {}
+        self._inflight: Dict[Any, _Flight] = {}
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get_or_compute(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """
+        Kembalikan nilai dari cache atau hitung lewat `compute`.
+        Hasil None (misalnya query gagal) tidak disimpan
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._stats['hits'] += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._stats['misses'] += 1
+            else:
+                self._stats['coalesced'] += 1
+            generation = self._generation
+
+        if not leader:
+            # Tunggu hasil dari sesi yang sedang mengambil data yang sama
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            size = self._size(flight.value)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                # Jangan simpan hasil yang dimulai sebelum invalidasi
+                if flight.error is None and flight.value is not None and generation == self._generation:
+                    self._store(key, flight.value, size)
+            flight.event.set()
+        return flight.value
+
+    @staticmethod
+    def _size(value: Any) -> int:
+        return sum(size for _, size in estimate_size(value)) if value is not None else 0
+
+    def _store(self, key: Any, value: Any, size: int):
+        """
+        Simpan entri lalu buang entri kedaluwarsa dan entri LRU sampai batas terpenuhi.
+        Dipanggil dengan self._lock dipegang; entri yang baru disimpan selalu dipertahankan
+        """
+        now = time.monotonic()
+        self._entries[key] = (now, value)
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        expired = [k for k, (stored, _) in self._entries.items()
+                   if now - stored > self.ttl and k != key and k not in self.pinned]
+        for k in expired:
+            self._drop(k)
+        while len(self._entries) > self.max_entries or sum(self._sizes.values()) > self.max_bytes:
+            victim = next((k for k in self._entries if k != key and k not in self.pinned), None)
+            if victim is None:
+                break
+            self._drop(victim)
+            self._stats['evictions'] += 1
+
+    def _drop(self, key: Any):
+        self._entries.pop(key, None)
+        self._sizes.pop(key, None)
+
+    def peek(self, key: Any) -> Any:
+        """
+        Nilai terakhir untuk key tanpa memperhatikan TTL, atau None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def age(self, key: Any) -> Optional[float]:
+        """
+        Umur entri dalam detik, atau None jika tidak ada
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return time.monotonic() - entry[0] if entry is not None else None
+
+    def holds(self, value: Any) -> bool:
+        """
+        True jika objek `value` (objek yang sama, bukan salinan) tersimpan di cache ini
+        """
+        with self._lock:
+            return any(entry[1] is value for entry in self._entries.values())
+
+    def generation(self) -> int:
+        """
+        Nomor versi data; bertambah setiap kali isi cache diganti atau dikosongkan
+        """
+        with self._lock:
+            return self._generation
+
+    def replace(self, entries: Dict[Any, Any]):
+        """
+        Ganti seluruh isi cache secara atomik dengan entri yang diberikan
+        """
+        sizes = {key: self._size(value) for key, value in entries.items()}
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            for key, value in entries.items():
+                self._store(key, value, sizes[key])
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def invalidate(self, key: Any = None):
+        """
+        Hapus satu entri, atau semua entri jika key tidak diberikan
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._sizes.clear()
+                self._generation += 1
+            else:
+                self._drop(key)
+            self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Statistik cache bersama
+        """
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'inflight': len(self._inflight),
+                    'bytes': sum(self._sizes.values())}
+
+class FigureCache:
+    def __init__(self, max_entries: int = 256):
+        """
+        Cache LRU objek figure Plotly per proses, dengan key dari data masukannya.
+        Figure di cache hanya dibaca (diserialisasi oleh st.plotly_chart), tidak diubah
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+
+    def get_or_create(self, key: Any, build: Callable[[], go.Figure]) -> Tuple[go.Figure, bool]:
+        """
+        Kembalikan (figure, hit); figure dibangun lewat `build` jika belum ada
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key], True
+        fig = build()
+        with self._lock:
+            self._entries[key] = fig
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig, False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+def frame_fingerprint(data: pd.DataFrame) -> Tuple[Any, ...]:
+    """
+    Key isi DataFrame kecil (mis. hasil per cabang) untuk cache figure
+    """
+    return (tuple(data.columns), len(data), int(pd.util.hash_pandas_object(data, index=False).sum()))
+
+def estimate_size(value: Any, skip: Optional[Callable[[Any], bool]] = None) -> List[Tuple[int, int]]:
+    """
+    Ukuran objek cache dalam byte sebagai daftar (id objek, byte).
+    DataFrame diukur dengan memory_usage(deep=True); dict/list/tuple ditelusuri isinya.
+    Objek yang memenuhi `skip` (misalnya milik cache bersama) tidak diukur
+    """
+    if skip is not None and skip(value):
+        return []
+    if isinstance(value, pd.DataFrame):
+        return [(id(value), int(value.memory_usage(deep=True).sum()))]
+    if isinstance(value, pd.Series):
+        return [(id(value), int(value.memory_usage(deep=True)))]
+    if isinstance(value, dict):
+        return [part for item in value.values() for part in estimate_size(item, skip)]
+    if isinstance(value, (list, tuple)):
+        return [part for item in value for part in estimate_size(item, skip)]
+    return [(id(value), sys.getsizeof(value))]
+
+class SessionCache:
+    def __init__(self, max_entries: int = 8, max_bytes: int = 256 * 1024 ** 2,
+                 shared: Optional[Callable[[Any], bool]] = None):
+        """
+        Cache per sesi dengan batas jumlah entri (LRU) dan batas memori dalam byte.
+        Entri yang paling lama tidak dipakai dibuang lebih dulu. Batas byte hanya menghitung
+        objek milik sesi ini: objek yang juga disimpan cache bersama (`shared`) tidak ikut
+        dihitung, karena membuangnya dari sesi tidak membebaskan memori
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._sizes: Dict[str, List[Tuple[int, int]]] = {}
+        self.evictions = 0
+        # Pencarian key (`key in cache`) yang ditemukan / tidak ditemukan
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            found = key in self._entries
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def __setitem__(self, key: str, value: Any):
+        parts = estimate_size(value, self.shared)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = parts
+            self._evict(keep=key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Statistik cache sesi ini
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self._total_bytes()}
+
+    def _evict(self, keep: str):
+        """
+        Buang entri LRU sampai batas terpenuhi; entri yang baru disimpan selalu dipertahankan
+        """
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes() > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            del self._entries[oldest]
+            del self._sizes[oldest]
+            self.evictions += 1
+
+    def _total_bytes(self) -> int:
+        return sum(size for parts in self._sizes.values() for _, size in parts)
+
+    def total_bytes(self) -> int:
+        """
+        Total byte milik cache sesi ini (tanpa objek cache bersama)
+        """
+        with self._lock:
+            return self._total_bytes()
+
+    def parts(self) -> List[Tuple[int, int]]:
+        """
+        Semua (id objek, byte) yang dirujuk cache ini, untuk laporan lintas sesi
+        """
+        with self._lock:
+            return [part for parts in self._sizes.values() for part in parts]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+
+class SessionCacheRegistry:
+    def __init__(self):
+        """
+        Daftar semua cache sesi yang masih hidup di proses server ini (weak reference)
+        """
+        self._lock = threading.Lock()
+        self._caches = weakref.WeakSet()
+
+    def register(self, cache: SessionCache):
+        with self._lock:
+            self._caches.add(cache)
+
+    def report(self) -> Dict[str, int]:
+        """
+        Total memori cache semua sesi. `unique_bytes` menghitung objek yang dipakai
+        bersama (misalnya dari cache bersama) hanya sekali
+        """
+        with self._lock:
+            caches = list(self._caches)
+        unique = {}
+        referenced = 0
+        entries = 0
+        evictions = 0
+        for cache in caches:
+            for object_id, size in cache.parts():
+                unique[object_id] = size
+                referenced += size
+            entries += len(cache)
+            evictions += cache.evictions
+        return {
+            'sessions': len(caches),
+            'entries': entries,
+            'evictions': evictions,
+            'referenced_bytes': referenced,
+            'unique_bytes': sum(unique.values()),
+        }
+
+def format_bytes(size: float) -> str:
+    """
+    Format ukuran byte agar mudah dibaca
+    """
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+class DetailExporter:
+    FORMATS = {
+        'CSV': ('csv', 'text/csv'),
+        'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+        'XLSX': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    }
+    XLSX_MAX_ROWS = 1_048_575  # batas baris per sheet Excel, di luar header
+    STATIC_MAX_BYTES = 200 * 1024 ** 2  # batas ukuran per file static serving Streamlit
+    DOWNLOAD_MAX_BYTES = 50 * 1024 ** 2  # batas st.download_button (file disimpan di memori server)
+
+    def __init__(self, directory: str, static_dir: Optional[str] = None,
+                 chunk_rows: int = 100_000, max_files: int = 20):
+        """
+        Ekspor data detail ke file CSV/Parquet/XLSX per potongan baris, langsung dari
+        DataFrame yang sudah di-cache (tanpa salinan penuh tambahan). File hasil disimpan
+        di `directory` dan dipakai ulang untuk ekspor yang sama dari versi data yang sama.
+        Jika `directory` berada di folder static aplikasi (`static_dir`), file diunduh
+        langsung dari disk lewat static serving Streamlit
+        """
+        self.directory = directory
+        self.static_dir = static_dir
+        self.chunk_rows = chunk_rows
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def available_formats() -> List[str]:
+        """
+        Format yang bisa dipakai; XLSX butuh paket opsional xlsxwriter
+        """
+        formats = ['CSV', 'Parquet']
+        try:
+            import xlsxwriter
+            formats.append('XLSX')
+        except ImportError:
+            pass
+        return formats
+
+    def _prefix(self, version: Any, branches: Tuple[str, ...], columns: List[str], fmt: str) -> str:
+        key = json.dumps([version, list(branches), list(columns), fmt], default=str)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f"sla_detail_{digest}_"
+
+    def find(self, version: Any, branches: Tuple[str, ...], columns: List[str], fmt: str) -> Optional[str]:
+        """
+        Path file ekspor yang sudah ada untuk versi data, cabang, kolom dan format ini, jika ada
+        """
+        prefix = self._prefix(version, branches, columns, fmt)
+        suffix = f".{self.FORMATS[fmt][0]}"
+        try:
+            names = [name for name in os.listdir(self.directory) if name.startswith(prefix) and name.endswith(suffix)]
+        except OSError:
+            return None
+        return os.path.join(self.directory, names[0]) if names else None
+
+    def export(self, data: pd.DataFrame, version: Any, branches: Tuple[str, ...],
+               columns: List[str], fmt: str) -> str:
+        """
+        Kembalikan path file ekspor; file yang sudah ada untuk versi data, cabang,
+        kolom dan format yang sama dipakai ulang tanpa ditulis ulang.
+        Nama file diberi token acak agar URL static-nya tidak bisa ditebak
+        """
+        prefix = self._prefix(version, branches, columns, fmt)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(prefix + fmt, threading.Lock())
+        with key_lock:
+            path = self.find(version, branches, columns, fmt)
+            if path is not None:
+                os.utime(path)
+                return path
+            path = os.path.join(self.directory, f"{prefix}{secrets.token_urlsafe(16)}.{self.FORMATS[fmt][0]}")
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                getattr(self, f'_write_{self.FORMATS[fmt][0]}')(data, columns, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self._cleanup(keep=path)
+        return path
+
+    def url_for(self, path: str) -> Optional[str]:
+        """
+        URL relatif static serving untuk file ekspor, atau None jika file tidak bisa
+        dilayani dari disk (static serving nonaktif, di luar folder static, atau terlalu besar)
+        """
+        if self.static_dir is None:
+            return None
+        relative = os.path.relpath(os.path.realpath(path), os.path.realpath(self.static_dir))
+        if relative.startswith(os.pardir) or os.path.getsize(path) > self.STATIC_MAX_BYTES:
+            return None
+        return 'app/static/' + relative.replace(os.sep, '/')
+
+    def _chunks(self, data: pd.DataFrame, columns: List[str]) -> Iterator[pd.DataFrame]:
+        # Hanya satu potongan kolom terpilih yang disalin pada satu waktu
+        for start in range(0, len(data), self.chunk_rows):
+            yield data.iloc[start:start + self.chunk_rows][columns]
+
+    @staticmethod
+    def _arrow_schema(data: pd.DataFrame, columns: List[str]) -> pa.Schema:
+        """
+        Skema dari dtype kolom (bukan dari isi potongan), agar kolom yang kosong
+        di satu potongan tetap bertipe sama di semua potongan
+        """
+        schema = pa.Schema.from_pandas(data.iloc[:0][columns], preserve_index=False)
+        return pa.schema([
+            field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema
+        ], metadata=schema.metadata)
+
+    def _write_csv(self, data: pd.DataFrame, columns: List[str], path: str):
+        import pyarrow.csv
+        schema = self._arrow_schema(data, columns)
+        # Tanggal ditulis sampai detik, tanpa pecahan mikrodetik
+        csv_schema = pa.schema([
+            field.with_type(pa.timestamp('s')) if pa.types.is_timestamp(field.type) else field for field in schema
+        ])
+        with pyarrow.csv.CSVWriter(path, csv_schema) as writer:
+            for chunk in self._chunks(data, columns):
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                writer.write_table(table.cast(csv_schema, safe=False))
+
+    def _write_parquet(self, data: pd.DataFrame, columns: List[str], path: str):
+        import pyarrow.parquet as pq
+        schema = self._arrow_schema(data, columns)
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in self._chunks(data, columns):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+    def _write_xlsx(self, data: pd.DataFrame, columns: List[str], path: str):
+        import xlsxwriter
+        # constant_memory: baris ditulis langsung ke file, tidak disimpan di memori
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'remove_timezone': True})
+        date_format = workbook.add_format({'num_format': 'dd-mm-yyyy'})
+        sheet = None
+        row = 0
+        try:
+            if data.empty:
+                workbook.add_worksheet('Data').write_row(0, 0, columns)
+            for chunk in self._chunks(data, columns):
+                values = chunk.astype(object).where(chunk.notna(), None)
+                for record in values.itertuples(index=False, name=None):
+                    if sheet is None or row > self.XLSX_MAX_ROWS:
+                        sheet = workbook.add_worksheet(f'Data{len(workbook.worksheets()) + 1}')
+                        sheet.write_row(0, 0, columns)
+                        row = 1
+                    for column_index, value in enumerate(record):
+                        if isinstance(value, datetime):
+                            sheet.write_datetime(row, column_index, value, date_format)
+                        elif value is not None:
+                            sheet.write(row, column_index, value)
+                    row += 1
+        finally:
+            workbook.close()
+
+    def _cleanup(self, keep: str):
+        """
+        Simpan paling banyak `max_files` file ekspor terbaru
+        """
+        try:
+            files = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.startswith('sla_detail_') and not name.endswith('.tmp')
+            ]
+            files.sort(key=os.path.getmtime, reverse=True)
+            for path in files[self.max_files:]:
+                if path != keep:
+                    os.remove(path)
+        except OSError:
+            pass
+
+class TrendStore:
+    def __init__(self, path: str):
+        """
+        Rollup harian SLA per hari x cabang x komponen (jumlah OK dan total unit yang dihitung)
+        di file SQLite lokal. Diisi dari cube yang sama dengan gauge, jadi tren dan gauge
+        memakai logika status yang sama; Nama_Cabang NULL disimpan sebagai ''
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._last: Optional[Tuple[str, Any]] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sla_daily (
+                    day TEXT NOT NULL,
+                    branch TEXT NOT NULL,
+                    component TEXT NOT NULL,
+                    ok INTEGER NOT NULL,
+                    total INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (day, branch, component)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, cube: SLACountCube, day: Optional[date] = None) -> bool:
+        """
+        Simpan rollup hari ini dari cube (menimpa rollup hari yang sama).
+        Cube yang sama tidak ditulis dua kali; cube kosong (data gagal dimuat) diabaikan
+        """
+        day_key = (day or date.today()).isoformat()
+        if not cube.row_totals.sum():
+            return False
+        with self._lock:
+            if self._last is not None and self._last[0] == day_key and self._last[1]() is cube:
+                return False
+            updated_at = datetime.now().isoformat(timespec='seconds')
+            rows = []
+            for c, key in enumerate(cube.components):
+                ok = cube.counts[:, c, 0]
+                total = ok + cube.counts[:, c, 1]
+                for i in np.flatnonzero(total):
+                    branch = cube.branches[i]
+                    rows.append((day_key, '' if branch is None else str(branch), key,
+                                 int(ok[i]), int(total[i]), updated_at))
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM sla_daily WHERE day = ?", (day_key,))
+                conn.executemany("INSERT INTO sla_daily VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._last = (day_key, weakref.ref(cube))
+        return True
+
+    def trend(self, branches: Tuple[str, ...] = (), days: int = 90) -> pd.DataFrame:
+        """
+        Persentase SLA harian per komponen untuk subset cabang (tuple kosong = semua cabang),
+        dengan pembulatan yang sama seperti gauge
+        """
+        since = (date.today() - timedelta(days=days)).isoformat()
+        query = "SELECT day, component, SUM(ok) AS ok, SUM(total) AS total FROM sla_daily WHERE day >= ?"
+        params: List[Any] = [since]
+        if branches:
+            query += f" AND branch IN ({', '.join('?' * len(branches))})"
+            params.extend(branches)
+        query += " GROUP BY day, component ORDER BY day, component"
+        with closing(self._connect()) as conn:
+            data = pd.read_sql_query(query, conn, params=params)
+        data['day'] = pd.to_datetime(data['day'])
+        ratio = (data['ok'] / data['total'].where(data['total'] > 0)).round(3) * 100
+        data['persentase'] = ratio.where(data['ok'] > 0, 0.0).fillna(0.0)
+        return data
+
+    @staticmethod
+    def week_over_week(trend: pd.DataFrame) -> Dict[str, Tuple[float, Optional[float]]]:
+        """
+        Per komponen: (persentase terakhir, selisih terhadap data 7 hari sebelumnya atau None)
+        """
+        result = {}
+        for component, rows in trend.groupby('component', sort=False):
+            latest = rows.iloc[-1]
+            previous = rows[rows['day'] <= latest['day'] - pd.Timedelta(days=7)]
+            delta = latest['persentase'] - previous.iloc[-1]['persentase'] if not previous.empty else None
+            result[component] = (float(latest['persentase']), None if delta is None else float(delta))
+        return result
+
+def format_age(seconds: float) -> str:
+    """
+    Format umur data agar mudah dibaca
+    """
+    if seconds < 60:
+        return "baru saja"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} menit lalu"
+    return f"{seconds / 3600:.1f} jam lalu"
+
+class CacheWarmer:
+    def __init__(self, warm: Callable[[bool, bool], str], interval: float = 300.0):
+        """
+        Thread latar belakang (satu per proses) yang menghitung ulang data bersama saat start,
+        setiap `interval` detik, dan saat dipicu tombol Refresh. Selama pembaruan berjalan,
+        sesi tetap dilayani dari hasil terakhir yang berhasil (stale-while-revalidate).
+        `warm(full, scheduled)`: `scheduled` True untuk putaran terjadwal (bukan dari trigger)
+        """
+        self._warm = warm
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._full = False
+        self._requested = False
+        self.running = False
+        self.runs = 0
+        self.last_success: Optional[datetime] = None
+        self.last_info: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._thread = threading.Thread(target=self._loop, name='sla-cache-warmer', daemon=True)
+
+    def start(self) -> 'CacheWarmer':
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    def trigger(self, full: bool = False):
+        """
+        Minta pembaruan di luar jadwal; tidak menunggu pembaruan selesai
+        """
+        with self._lock:
+            self._full = self._full or full
+            self._requested = True
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            # Bersihkan wake sebelum mengambil flag: permintaan yang masuk setelah ini (juga
+            # selama pembaruan berjalan) tetap membangunkan loop untuk satu putaran lagi
+            self._wake.clear()
+            with self._lock:
+                full, self._full = self._full, False
+                requested, self._requested = self._requested, False
+            self.running = True
+            try:
+                self.last_info = self._warm(full, not requested)
+                self.last_success = datetime.now()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            finally:
+                self.running = False
+                self.runs += 1
+            self._wake.wait(self.interval)
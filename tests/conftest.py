@@ -0,0 +1,46 @@
+"""
+Fixture bersama: database SLA_HMS sintetis di SQLite (generator yang sama dengan benchmark)
+"""
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from benchmarks.fleet import FLEET_COLUMNS, write_fleet
+from sla_core import DETAIL_SCHEMA, QUERY_DETAIL, DatabaseConnection, SQLiteBackend
+
+
+def insert_rows(path: str, rows):
+    """
+    Tambahkan baris (dict kolom -> nilai) ke SLA_HMS; kolom yang tidak diisi menjadi NULL
+    """
+    with closing(sqlite3.connect(path)) as conn, conn:
+        for row in rows:
+            columns = list(row)
+            conn.execute(
+                f"INSERT INTO SLA_HMS ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [row[c] for c in columns],
+            )
+
+
+@pytest.fixture
+def fleet_db(tmp_path):
+    path = str(tmp_path / 'fleet.db')
+    write_fleet(path, 3000, seed=7)
+    # Kasus tepi: transmisi NULL (tidak dihitung untuk Kopling, seperti <> 'A/T' di SQL)
+    # dan Nama_Cabang NULL (satu kelompok sendiri)
+    insert_rows(path, [
+        {'Nomor_Equipment': 'EQX1', 'Nama_Cabang': 'JAKARTA', 'Tipe_Transmisi': None,
+         'Status_ACCU': 'OK', 'Status_Kopling': 'OK', 'Status_PB': None, 'Status_Ban': 'NOT OK'},
+        {'Nomor_Equipment': 'EQX2', 'Nama_Cabang': None, 'Tipe_Transmisi': 'M/T',
+         'Status_ACCU': 'NOT OK', 'Status_Kopling': 'OK', 'Status_PB': 'OK', 'Status_Ban': None},
+    ])
+    return path
+
+
+@pytest.fixture
+def fleet_frame(fleet_db):
+    db = DatabaseConnection(SQLiteBackend(fleet_db), pool_size=2)
+    data = db.query_data(QUERY_DETAIL.format(branch_filter=''), schema=DETAIL_SCHEMA)
+    assert list(data.columns) == FLEET_COLUMNS
+    return data
@@ -0,0 +1,117 @@
+"""
+SLACountCube harus memberi hasil yang sama dengan query SQL asli dashboard
+(gauge per komponen dan breakdown per cabang x status)
+"""
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+import pytest
+
+from sla_core import SLA_COMPONENTS, SLAAggregator, SLACountCube, branch_filter
+
+# Filter baris per komponen seperti query aslinya: Kopling tanpa unit A/T
+WHERE = {key: "tipe_transmisi <> 'A/T'" if config['exclude_at'] else "1=1"
+         for key, config in SLA_COMPONENTS.items()}
+
+
+def sql_percentage(conn, key, branches=()):
+    status = SLA_COMPONENTS[key]['status_column']
+    clause, params = branch_filter(branches)
+    value = conn.execute(f"""
+        SELECT ROUND((SUM(CASE WHEN {status} = 'OK' THEN 1 END) * 1.0 / COUNT(*)), 3) AS persentase
+        FROM SLA_HMS
+        WHERE {WHERE[key]} {clause}
+    """, params).fetchone()[0]
+    return value * 100 if value else 0
+
+
+def sql_breakdown(conn, key, branches=()):
+    status = SLA_COMPONENTS[key]['status_column']
+    clause, params = branch_filter(branches)
+    rows = conn.execute(f"""
+        SELECT Nama_Cabang, {status},
+            ROUND((COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY Nama_Cabang)) * 100, 2) AS persentase
+        FROM SLA_HMS
+        WHERE {WHERE[key]} {clause}
+        GROUP BY Nama_Cabang, {status}
+    """, params).fetchall()
+    # Status NULL menjadi kelompok sendiri di SQL; di cube dihitung sebagai NOT OK
+    result = {}
+    for branch, value, percentage in rows:
+        label = 'OK' if value == 'OK' else 'NOT OK'
+        result[(branch, label)] = result.get((branch, label), 0) + percentage
+    return result
+
+
+def cube_breakdown(frame, key):
+    status = SLA_COMPONENTS[key]['status_column']
+    # Nama_Cabang NULL tampil sebagai NaN di DataFrame, None di hasil SQL
+    return {(None if pd.isna(row['Nama_Cabang']) else row['Nama_Cabang'], row[status]): row['persentase']
+            for _, row in frame.iterrows()}
+
+
+@pytest.fixture
+def cube(fleet_frame):
+    return SLACountCube.from_frame(fleet_frame, SLAAggregator())
+
+
+@pytest.mark.parametrize('branches', [(), ('JAKARTA',), ('BANDUNG', 'MEDAN', 'SURABAYA')])
+def test_cube_matches_sql(fleet_db, cube, branches):
+    percentages, branch_results = cube.query(branches)
+    with closing(sqlite3.connect(fleet_db)) as conn:
+        for key in SLA_COMPONENTS:
+            assert percentages[key] == pytest.approx(sql_percentage(conn, key, branches))
+            expected = sql_breakdown(conn, key, branches)
+            actual = cube_breakdown(branch_results[key], key)
+            assert actual.keys() == expected.keys()
+            for group, value in expected.items():
+                # NOT OK di SQL bisa berasal dari dua kelompok yang masing-masing dibulatkan
+                assert actual[group] == pytest.approx(value, abs=0.011)
+
+
+def test_kopling_excludes_at_and_null_transmission(fleet_db, cube):
+    c = list(SLA_COMPONENTS).index('kopling')
+    with closing(sqlite3.connect(fleet_db)) as conn:
+        eligible, rows, at_units = conn.execute("""
+            SELECT SUM(tipe_transmisi <> 'A/T'), COUNT(*), SUM(tipe_transmisi = 'A/T') FROM SLA_HMS
+        """).fetchone()
+    assert at_units > 0
+    assert int(cube.counts[:, c].sum()) == eligible
+    # Baris dengan transmisi NULL juga tidak dihitung
+    assert eligible < rows - at_units
+    accu = list(SLA_COMPONENTS).index('accu')
+    assert int(cube.counts[:, accu].sum()) == rows == int(cube.row_totals.sum())
+
+
+def test_null_status_counts_as_not_ok(fleet_db, cube):
+    c = list(SLA_COMPONENTS).index('pb')
+    with closing(sqlite3.connect(fleet_db)) as conn:
+        ok, not_ok = conn.execute("""
+            SELECT SUM(Status_PB = 'OK'), SUM(Status_PB IS NULL OR Status_PB <> 'OK') FROM SLA_HMS
+        """).fetchone()
+    assert int(cube.counts[:, c, 0].sum()) == ok
+    assert int(cube.counts[:, c, 1].sum()) == not_ok
+
+
+def test_null_branch_is_its_own_group(cube):
+    assert None in cube.branches
+    assert None not in cube.branch_names()
+    assert cube.row_totals[cube.branches.index(None)] == 1
+
+
+def test_status_comparison_ignores_case_and_trailing_spaces(fleet_frame):
+    data = fleet_frame.head(3).copy()
+    data['Status_ACCU'] = ['ok ', 'Ok', 'NOT OK']
+    data['Tipe_Transmisi'] = ['a/t', 'A/T ', 'M/T']
+    cube = SLACountCube.from_frame(data, SLAAggregator())
+    accu, kopling = list(SLA_COMPONENTS).index('accu'), list(SLA_COMPONENTS).index('kopling')
+    assert cube.counts[:, accu].sum(axis=0).tolist() == [2, 1]
+    assert int(cube.counts[:, kopling].sum()) == 1
+
+
+def test_empty_frame_gives_empty_cube():
+    cube = SLACountCube.from_frame(None, SLAAggregator())
+    percentages, branch_results = cube.query()
+    assert percentages == {key: 0 for key in SLA_COMPONENTS}
+    assert all(frame.empty for frame in branch_results.values())
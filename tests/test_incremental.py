@@ -0,0 +1,92 @@
+"""
+Refresh inkremental: baris delta yang tidak berubah dibuang, dan cube hasil merge_delta
+sama dengan cube yang dibangun ulang dari seluruh data
+"""
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from sla_core import (
+    DETAIL_SCHEMA, QUERY_DETAIL, SLAAggregator, SLACountCube, DatabaseConnection, SQLiteBackend,
+    drop_unchanged_rows, merge_delta,
+)
+
+KEY = 'Nomor_Equipment'
+
+
+def read_rows(path, keys):
+    """
+    Baca ulang baris tertentu dari database, seperti query delta watermark
+    """
+    db = DatabaseConnection(SQLiteBackend(path), pool_size=1)
+    clause = f"AND {KEY} IN ({', '.join('?' * len(keys))})"
+    return db.query_data(QUERY_DETAIL.format(branch_filter=clause), schema=DETAIL_SCHEMA, params=keys)
+
+
+def cube_counts(cube):
+    return {branch: cube.counts[i].tolist() for i, branch in enumerate(cube.branches) if cube.row_totals[i]}
+
+
+def test_reread_rows_are_unchanged(fleet_db, fleet_frame):
+    # Termasuk baris dengan status NULL: NULL dianggap sama dengan NULL
+    keys = list(fleet_frame[KEY].iloc[:20]) + ['EQX1', 'EQX2']
+    rows = read_rows(fleet_db, keys)
+    assert len(rows) == 22
+    assert drop_unchanged_rows(fleet_frame, rows, KEY).empty
+
+
+def test_changed_and_new_rows_are_kept(fleet_db, fleet_frame):
+    keys = list(fleet_frame[KEY].iloc[:5])
+    with closing(sqlite3.connect(fleet_db)) as conn, conn:
+        conn.execute(f"UPDATE SLA_HMS SET Status_ACCU = NULL WHERE {KEY} = ?", (keys[0],))
+        conn.execute(f"UPDATE SLA_HMS SET km_harian = km_harian + 1 WHERE {KEY} = ?", (keys[1],))
+        conn.execute(f"UPDATE SLA_HMS SET {KEY} = 'EQBARU' WHERE {KEY} = ?", (keys[2],))
+    rows = read_rows(fleet_db, keys + ['EQBARU'])
+
+    kept = drop_unchanged_rows(fleet_frame, rows, KEY)
+    assert sorted(kept[KEY]) == sorted([keys[0], keys[1], 'EQBARU'])
+
+
+def test_duplicate_delta_keys_keep_last(fleet_frame):
+    row = fleet_frame.iloc[[0]]
+    changed = row.assign(Status_Ban='NOT OK' if row['Status_Ban'].iloc[0] == 'OK' else 'OK')
+    kept = drop_unchanged_rows(fleet_frame, pd.concat([changed, row]), KEY)
+    assert kept.empty
+
+
+def test_merge_delta_matches_full_rebuild(fleet_frame):
+    aggregator = SLAAggregator()
+    cube = SLACountCube.from_frame(fleet_frame, aggregator)
+
+    updated = fleet_frame.iloc[:50].copy()
+    updated['Status_Kopling'] = 'OK'
+    updated['Tipe_Transmisi'] = 'M/T'
+    updated['Nama_Cabang'] = 'CABANG BARU'
+    added = fleet_frame.iloc[:3].copy()
+    added[KEY] = ['EQN1', 'EQN2', 'EQN3']
+    deleted = list(fleet_frame[KEY].iloc[100:110])
+    rows = pd.concat([updated, added], ignore_index=True)
+
+    merged, removed, new_rows = merge_delta(fleet_frame, rows, deleted, KEY)
+
+    assert len(merged) == len(fleet_frame) + 3 - len(deleted)
+    assert merged[KEY].is_unique
+    assert not merged[KEY].isin(deleted).any()
+    assert len(removed) == 60 and len(new_rows) == 53
+    merged_rows = merged.set_index(KEY).loc[updated[KEY]]
+    assert (merged_rows['Nama_Cabang'] == 'CABANG BARU').all()
+    # Tipe ringkas tetap dipakai setelah penggabungan
+    assert isinstance(merged['Nama_Cabang'].dtype, pd.CategoricalDtype)
+
+    patched = cube.merge(SLACountCube.from_frame(removed, aggregator), sign=-1)
+    patched = patched.merge(SLACountCube.from_frame(new_rows, aggregator), sign=1)
+    rebuilt = SLACountCube.from_frame(merged, aggregator)
+    assert cube_counts(patched) == cube_counts(rebuilt)
+    assert patched.query()[0] == rebuilt.query()[0]
+    for key, frame in rebuilt.query()[1].items():
+        expected = frame.sort_values(list(frame.columns[:2])).reset_index(drop=True)
+        actual = patched.query()[1][key]
+        actual = actual.sort_values(list(actual.columns[:2])).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
+    assert patched.branch_names() == rebuilt.branch_names()
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from sla_core import ConnectionPool, PoolTimeoutError, SQLiteBackend, create_connection_pool
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / 'pool.db'))
+
+
+def test_checkout_reuses_released_connection(backend):
+    pool = create_connection_pool(backend, max_size=2)
+    with pool.connection() as first:
+        assert pool.stats()['in_use'] == 1
+    with pool.connection() as second:
+        assert second is first
+    stats = pool.stats()
+    assert stats['creations'] == 1
+    assert stats['hits'] == 1
+    assert stats['idle'] == 1 and stats['in_use'] == 0
+
+
+def test_concurrent_checkouts_get_distinct_connections(backend):
+    pool = create_connection_pool(backend, max_size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    assert pool.stats()['size'] == 2
+    pool.release(first)
+    pool.release(second)
+
+
+def test_idle_connection_is_recycled(backend):
+    pool = ConnectionPool(backend.connect, max_size=1, max_idle=0.01)
+    with pool.connection() as first:
+        pass
+    time.sleep(0.05)
+    with pool.connection() as second:
+        assert second is not first
+    stats = pool.stats()
+    assert stats['recycled'] == 1
+    assert stats['creations'] == 2
+    assert stats['size'] == 1
+
+
+def test_broken_idle_connection_fails_ping_and_is_replaced(backend):
+    pool = create_connection_pool(backend, max_size=1)
+    with pool.connection() as first:
+        pass
+    first.close()
+    with pool.connection() as second:
+        assert second is not first
+        assert second.execute("SELECT 1").fetchone() == (1,)
+    stats = pool.stats()
+    assert stats['ping_failures'] == 1
+    assert stats['size'] == 1
+
+
+def test_connection_is_discarded_on_error(backend):
+    pool = create_connection_pool(backend, max_size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("query gagal")
+    stats = pool.stats()
+    assert stats['discarded'] == 1
+    assert stats['size'] == 0 and stats['idle'] == 0
+
+
+def test_checkout_times_out_when_pool_is_exhausted(backend):
+    pool = ConnectionPool(backend.connect, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waits'] == 1
+    pool.release(held)
+    # Slot tetap bisa dipakai setelah timeout
+    with pool.connection() as conn:
+        assert conn is held
+
+
+def test_waiter_receives_released_connection(backend):
+    pool = ConnectionPool(backend.connect, max_size=1, timeout=5.0)
+    held = pool.acquire()
+    received = []
+    waiter = threading.Thread(target=lambda: received.append(pool.acquire()))
+    waiter.start()
+    while pool.stats()['waits'] == 0:
+        time.sleep(0.001)
+    pool.release(held)
+    waiter.join(5.0)
+    assert received == [held]
+    assert pool.stats()['creations'] == 1
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from sla_core import SharedResultCache
+
+
+def run_concurrently(cache, key, compute, n):
+    results = [None] * n
+    errors = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = cache.get_or_compute(key, compute)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "kondisi tidak tercapai"
+        time.sleep(0.001)
+
+
+def test_concurrent_requests_are_coalesced():
+    cache = SharedResultCache(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5.0)
+        return {'nilai': len(calls)}
+
+    threads, results, errors = run_concurrently(cache, 'detail', compute, 8)
+    # Lepas pengambilan data setelah semua sesi lain ikut menunggu
+    wait_for(lambda: cache.stats()['coalesced'] == 7)
+    release.set()
+    for thread in threads:
+        thread.join(5.0)
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()
+    assert stats['misses'] == 1 and stats['coalesced'] == 7
+    assert stats['inflight'] == 0
+    assert cache.get_or_compute('detail', compute) is results[0]
+    assert cache.stats()['hits'] == 1
+
+
+def test_error_reaches_waiters_and_is_not_cached():
+    cache = SharedResultCache(ttl=60)
+    release = threading.Event()
+
+    def failing():
+        release.wait(5.0)
+        raise RuntimeError("query gagal")
+
+    threads, results, errors = run_concurrently(cache, 'detail', failing, 4)
+    wait_for(lambda: cache.stats()['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5.0)
+
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert cache.stats()['entries'] == 0
+    assert cache.get_or_compute('detail', lambda: 'baru') == 'baru'
+
+
+def test_result_started_before_invalidate_is_not_stored():
+    cache = SharedResultCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5.0)
+        return 'lama'
+
+    threads, results, _ = run_concurrently(cache, 'detail', compute, 1)
+    started.wait(5.0)
+    cache.invalidate()
+    release.set()
+    threads[0].join(5.0)
+
+    assert results == ['lama']
+    assert cache.peek('detail') is None
+
+
+def test_none_result_is_not_cached():
+    cache = SharedResultCache(ttl=60)
+    assert cache.get_or_compute('detail', lambda: None) is None
+    assert cache.get_or_compute('detail', lambda: 'ada') == 'ada'
+
+
+def test_entries_expire_after_ttl():
+    cache = SharedResultCache(ttl=0.01)
+    cache.get_or_compute('a', lambda: 'lama')
+    time.sleep(0.05)
+    assert cache.get_or_compute('a', lambda: 'baru') == 'baru'
+    assert cache.stats()['misses'] == 2
+
+
+def test_lru_eviction_keeps_pinned_keys():
+    cache = SharedResultCache(ttl=60, max_entries=2, pinned=[('detail', ())])
+    cache.get_or_compute(('detail', ()), lambda: 'dasar')
+    cache.get_or_compute('a', lambda: 'a')
+    cache.get_or_compute('b', lambda: 'b')
+
+    assert cache.peek(('detail', ())) == 'dasar'
+    assert cache.peek('a') is None
+    assert cache.peek('b') == 'b'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_limit_evicts_least_recently_used():
+    # Tiap nilai sekitar 1 KB: muat tiga entri, bukan empat
+    cache = SharedResultCache(ttl=60, max_bytes=3200)
+    for key in 'abc':
+        cache.get_or_compute(key, lambda: b'x' * 1000)
+    # 'a' baru dipakai sehingga 'b' yang dibuang
+    cache.get_or_compute('a', pytest.fail)
+    cache.get_or_compute('d', lambda: b'x' * 1000)
+
+    assert cache.peek('b') is None
+    assert cache.peek('a') is not None and cache.peek('d') is not None
+    assert cache.stats()['bytes'] <= cache.max_bytes